@@ -1,5 +1,7 @@
 import os
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Allowed "image-only garbage" extensions
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff"}
@@ -7,13 +9,19 @@ IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff"}
 # Maximum size (bytes) for small trash images
 MAX_IMAGE_SIZE = 100 * 1024   # 100 KB
 
-def is_small_image(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
+# Threads for the per-directory checks (syscall-bound, not CPU-bound)
+MAX_WORKERS = 8
+
+def is_small_image(entry):
+    """
+    `entry` is an os.DirEntry; its cached stat avoids extra syscalls.
+    """
+    ext = os.path.splitext(entry.name)[1].lower()
     if ext not in IMAGE_EXTS:
         return False
     try:
-        return os.path.getsize(file_path) <= MAX_IMAGE_SIZE
-    except:
+        return entry.stat().st_size <= MAX_IMAGE_SIZE
+    except OSError:
         return False
 
 
@@ -25,20 +33,21 @@ def directory_is_deletable(path):
     - OR contains only other directories that will also be deleted (handled by bottom-up walk).
     """
     try:
-        entries = [os.path.join(path, f) for f in os.listdir(path)]
-    except Exception:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
         return False
 
     if not entries:
         return True  # Empty directory
 
-    for item in entries:
-        if os.path.isdir(item):
+    for entry in entries:
+        if entry.is_dir():
             # Subdirectories will be evaluated in the walk loop after we evaluate them individually
             continue
 
         # File: Accept only small images
-        if not is_small_image(item):
+        if not is_small_image(entry):
             return False
 
     return True  # Only small images (all valid trash)
@@ -49,15 +58,17 @@ def remove_directory_with_small_images(path):
     Deletes small images inside the directory, then removes the directory.
     """
     try:
-        for f in os.listdir(path):
-            fp = os.path.join(path, f)
+        with os.scandir(path) as it:
+            entries = list(it)
 
-            if os.path.isfile(fp) and is_small_image(fp):
+        for entry in entries:
+            if entry.is_file() and is_small_image(entry):
                 try:
-                    os.remove(fp)
-                    print(f"[🗑️] Deleted small image ({os.path.getsize(fp)} bytes): {fp}")
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    print(f"[🗑️] Deleted small image ({size} bytes): {entry.path}")
                 except Exception as e:
-                    print(f"[!] Error deleting file {fp}: {e}")
+                    print(f"[!] Error deleting file {entry.path}: {e}")
 
         # Now directory should be empty or only subfolders that will be removed later
         if not os.listdir(path):
@@ -71,16 +82,27 @@ def remove_directory_with_small_images(path):
     return False
 
 
-def clean_directories(path):
-    removed_count = 0
+def clean_directory(path):
+    return directory_is_deletable(path) and remove_directory_with_small_images(path)
 
-    for root, dirs, files in os.walk(path, topdown=False):
+
+def clean_directories(path):
+    # Group directories by depth. Directories at the same depth never
+    # contain each other, so each level can be processed in parallel;
+    # levels still run deepest first to keep the bottom-up semantics.
+    path = os.path.normpath(path)
+    levels = defaultdict(list)
+    for root, dirs, files in os.walk(path):
+        rel = os.path.relpath(root, path)
+        depth = 0 if rel == os.curdir else rel.count(os.sep) + 1
         for d in dirs:
-            full_path = os.path.join(root, d)
+            levels[depth].append(os.path.join(root, d))
+
+    removed_count = 0
 
-            if directory_is_deletable(full_path):
-                if remove_directory_with_small_images(full_path):
-                    removed_count += 1
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for depth in sorted(levels, reverse=True):
+            removed_count += sum(executor.map(clean_directory, levels[depth]))
 
     return removed_count
 
@@ -18,36 +18,38 @@ import os
 import io
 import sqlite3
 import hashlib
+import mmap
 import subprocess
 import re
 import unicodedata
 import logging
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
 
-from mutagen import File as MutagenFile
 from dotenv import load_dotenv
-from PIL import Image
 
-try:
-    from tqdm import tqdm
-except Exception:
-    tqdm = None
-
-try:
-    import chromaprint
-except Exception:
-    chromaprint = None
+# mutagen, Pillow, tqdm and chromaprint are imported where they are
+# used, so commands that never touch audio files start quickly.
 
 
 # ================= CONFIG =================
 
-SUPPORTED_EXTS = {".mp3", ".flac", ".wav", ".m4a", ".ogg", ".aac", ".opus"}
+SUPPORTED_EXTS = frozenset({".mp3", ".flac", ".wav", ".m4a", ".ogg", ".aac", ".opus"})
 IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
 COMMON_COVER_NAMES = {"cover", "folder", "front", "album", "albumart"}
+FS_UNSAFE_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
 
 ENABLE_CHROMAPRINT = True
 FP_SECONDS = 90
+FP_CHUNK_SIZE = 1 << 16  # 64 KiB of PCM per chromaprint feed
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+UPSERT_BATCH_SIZE = 500
+ANALYZE_CHUNK_SIZE = 8  # files per worker task
+ANALYZE_WINDOW = 4  # tasks in flight per worker process
 DATABASES_DIR = Path("databases")
 
 
@@ -126,13 +128,18 @@ def resolve_database_path(cli_value=None):
 
 # ================= UTILITIES =================
 
-def log(msg):
-    logging.info(msg)
+def log(msg, *args):
+    # Arguments are %-formatted by logging, only if the record is emitted
+    logging.info(msg, *args)
 
 
-def maybe_progress(it, desc=None, enable=False):
-    if enable and tqdm:
-        return tqdm(it, desc=desc)
+def maybe_progress(it, desc=None, enable=False, total=None):
+    if enable:
+        try:
+            from tqdm import tqdm
+        except Exception:
+            return it
+        return tqdm(it, desc=desc, total=total)
     return it
 
 
@@ -140,30 +147,85 @@ def utcnow():
     return datetime.now(timezone.utc).isoformat()
 
 
-def is_audio_file(p: Path):
-    return p.is_file() and p.suffix.lower() in SUPPORTED_EXTS
+def iter_audio(src):
+    """
+    Yield (Path, stat_result) for audio files below src.
+
+    Stack-based os.scandir walk: DirEntry type checks reuse the
+    directory listing, so most entries cost no extra stat call, and
+    the one stat taken per audio file is cached on the DirEntry and
+    handed on so later stages never stat the file again.
+    Symlinked directories are not followed (same as Path.rglob).
+    """
+    stack = [str(src)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    # Extension first: is_file() may need a stat call
+                    # (symlinks, filesystems without d_type)
+                    elif os.path.splitext(e.name)[1].lower() in SUPPORTED_EXTS and e.is_file():
+                        try:
+                            st = e.stat()
+                        except OSError:
+                            continue
+                        yield Path(e.path), st
+        except OSError:
+            continue
 
 
 def sha256_file(path: Path):
     h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
+    with open(path, "rb", buffering=0) as f:
+        # Larger files are mapped and hashed in a single update() call,
+        # which runs entirely in C with the GIL released
+        if os.fstat(f.fileno()).st_size > HASH_CHUNK_SIZE:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(mm)
+                return h.hexdigest()
+            except (OSError, ValueError):
+                # Not mappable (e.g. some network filesystems)
+                pass
+
+        # Reuse one buffer for the whole file instead of allocating a
+        # new bytes object per chunk
+        buf = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buf)
+        for n in iter(lambda: f.readinto(buf), 0):
+            h.update(view[:n])
     return h.hexdigest()
 
 
+@lru_cache(maxsize=None)
+def _combining_table():
+    # str.translate table deleting every combining character. Built on
+    # first use only, since scanning all code points takes ~0.1 s.
+    return {
+        cp: None for cp in range(0x110000)
+        if unicodedata.combining(chr(cp))
+    }
+
+
 def normalize_str(s):
     if not s:
         return ""
+    # ASCII has nothing to decompose
+    if s.isascii():
+        return s.strip()
     s = unicodedata.normalize("NFKD", s)
-    return "".join(c for c in s if not unicodedata.combining(c)).strip()
+    return s.translate(_combining_table()).strip()
 
 
+# Artist/album components repeat for every track of an album
+@lru_cache(maxsize=1 << 16)
 def sanitize_for_fs(s):
     if not s:
         return "Unknown"
     s = normalize_str(s)
-    s = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", s)
+    s = FS_UNSAFE_RE.sub("_", s)
     return s.strip(" .")[:120]
 
 
@@ -194,6 +256,9 @@ def hash_image_bytes(data: bytes) -> str:
 # ================= ALBUM ART INGEST =================
 
 def ingest_album_art_for_file(c, file_row, audio_path: Path):
+    from mutagen import File as MutagenFile
+    from PIL import Image
+
     album_artist = file_row["album_artist"]
     album = file_row["album"]
     is_comp = file_row["is_compilation"]
@@ -282,29 +347,88 @@ def ingest_album_art_for_file(c, file_row, audio_path: Path):
 
 # ================= METADATA =================
 
+# Native tag keys for the fields extract_tags reads, per tag format.
+# These are the keys mutagen's easy wrappers map to.
+ID3_FRAMES = {
+    "artist": "TPE1",
+    "albumartist": "TPE2",
+    "album": "TALB",
+    "title": "TIT2",
+    "tracknumber": "TRCK",
+}
+MP4_ATOMS = {
+    "artist": "\xa9ART",
+    "albumartist": "aART",
+    "album": "\xa9alb",
+    "title": "\xa9nam",
+    "genre": "\xa9gen",
+}
+
+
+def _id3_value(tags, key):
+    if key == "genre":
+        frame = tags.get("TCON")
+        values = frame.genres if frame else None
+    else:
+        frame = tags.get(ID3_FRAMES[key])
+        values = frame.text if frame else None
+    return str(values[0]) if values else None
+
+
+def _mp4_value(tags, key):
+    if key == "tracknumber":
+        values = tags.get("trkn")
+        if not values:
+            return None
+        track, total = values[0]
+        return f"{track}/{total}" if total else str(track)
+    values = tags.get(MP4_ATOMS[key])
+    return values[0] if values else None
+
+
+def _tag_value(tags, key):
+    # Vorbis comments, APEv2, ASF, ...: already keyed by plain names
+    values = tags.get(key)
+    return values[0] if values else None
+
+
 def extract_tags(path: Path):
+    from mutagen import File as MutagenFile
+    from mutagen.id3 import ID3
+    from mutagen.mp4 import MP4Tags
+
     try:
-        audio = MutagenFile(path, easy=True)
-        raw = MutagenFile(path, easy=False)
+        # One parse per file; tags are read with their native keys
+        # instead of re-opening the file through an easy=True wrapper
+        raw = MutagenFile(path)
+        tags = raw.tags
+
+        if tags is None:
+            get = lambda key: None
+        elif isinstance(tags, ID3):
+            get = lambda key: _id3_value(tags, key)
+        elif isinstance(tags, MP4Tags):
+            get = lambda key: _mp4_value(tags, key)
+        else:
+            get = lambda key: _tag_value(tags, key)
 
-        album_artist = audio.get("albumartist", [None])[0] if audio else None
         is_comp = 0
 
-        if raw and hasattr(raw, "tags"):
-            for k in raw.tags.keys():
+        if tags is not None:
+            for k in tags.keys():
                 if str(k).lower() in ("tcmp", "compilation", "cpil"):
                     is_comp = 1
                     break
 
         return {
-            "artist": audio.get("artist", [None])[0],
-            "album_artist": album_artist,
-            "album": audio.get("album", [None])[0],
-            "title": audio.get("title", [None])[0],
-            "track": normalize_track(audio.get("tracknumber", [None])[0]),
-            "genre": audio.get("genre", [None])[0],
-            "duration": getattr(audio.info, "length", None),
-            "bitrate": getattr(audio.info, "bitrate", None),
+            "artist": get("artist"),
+            "album_artist": get("albumartist"),
+            "album": get("album"),
+            "title": get("title"),
+            "track": normalize_track(get("tracknumber")),
+            "genre": get("genre"),
+            "duration": getattr(raw.info, "length", None),
+            "bitrate": getattr(raw.info, "bitrate", None),
             "is_compilation": is_comp,
             "orig_name": path.stem,
         }
@@ -328,6 +452,11 @@ def extract_tags(path: Path):
 def create_db(db_path):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB mmap reads
     c = conn.cursor()
 
     c.executescript("""
@@ -338,6 +467,7 @@ def create_db(db_path):
         original_path TEXT UNIQUE,
         sha256 TEXT,
         size_bytes INTEGER,
+        mtime REAL,
         artist TEXT,
         album_artist TEXT,
         album TEXT,
@@ -366,6 +496,7 @@ def create_db(db_path):
         mime TEXT,
         width INTEGER,
         height INTEGER,
+        perceptual_hash TEXT,
         created_at TEXT NOT NULL
     );
 
@@ -421,11 +552,26 @@ def create_db(db_path):
         ON genre_mappings(normalized_token);
     """)
 
+    # ---- hot-path indexes (genre filtering / executor) ----
+    # Created after the lifecycle_state migration below, since older
+    # databases may not have that column yet.
+    def ensure_indexes():
+        c.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_file_genres_genre_file
+            ON file_genres(genre_id, file_id);
+        CREATE INDEX IF NOT EXISTS idx_files_lifecycle
+            ON files(lifecycle_state);
+        CREATE INDEX IF NOT EXISTS idx_actions_pending
+            ON actions(id) WHERE status = 'pending';
+        CREATE INDEX IF NOT EXISTS idx_actions_file_status
+            ON actions(file_id, status);
+        """)
+
     # ---- schema migration (safe) ----
     def ensure_column(table, column, ddl):
         cols = [r["name"] for r in c.execute(f"PRAGMA table_info({table})")]
         if column not in cols:
-            log(f"Schema upgrade: adding {table}.{column}")
+            log("Schema upgrade: adding %s.%s", table, column)
             c.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
 
     ensure_column(
@@ -434,6 +580,20 @@ def create_db(db_path):
         "lifecycle_state TEXT NOT NULL DEFAULT 'new'"
     )
 
+    ensure_column(
+        "files",
+        "mtime",
+        "mtime REAL"
+    )
+
+    ensure_column(
+        "album_art",
+        "perceptual_hash",
+        "perceptual_hash TEXT"
+    )
+
+    ensure_indexes()
+
     conn.commit()
     return conn
 
@@ -443,8 +603,19 @@ def create_db(db_path):
 
 # ================= FINGERPRINT =================
 
+@lru_cache(maxsize=None)
+def load_chromaprint():
+    # Cached, so a missing module is only looked up once
+    try:
+        import chromaprint
+    except Exception:
+        return None
+    return chromaprint
+
+
 def compute_fingerprint(path: Path):
-    if not ENABLE_CHROMAPRINT or chromaprint is None:
+    chromaprint = load_chromaprint() if ENABLE_CHROMAPRINT else None
+    if chromaprint is None:
         return None
 
     try:
@@ -458,18 +629,24 @@ def compute_fingerprint(path: Path):
             "-"
         ]
 
-        proc = subprocess.run(
+        # Feed PCM to chromaprint as it arrives instead of buffering
+        # the whole FP_SECONDS of audio (~8 MB) in memory first
+        fp = chromaprint.Fingerprinter(44100, 1)
+        fed = False
+
+        with subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
-            check=True
-        )
+            bufsize=FP_CHUNK_SIZE
+        ) as proc:
+            for chunk in iter(lambda: proc.stdout.read(FP_CHUNK_SIZE), b""):
+                fp.feed(chunk)
+                fed = True
 
-        if not proc.stdout:
+        if proc.returncode != 0 or not fed:
             return None
 
-        fp = chromaprint.Fingerprinter(44100, 1)
-        fp.feed(proc.stdout)
         fingerprint, _ = fp.finish()
 
         return hashlib.sha1(fingerprint.encode()).hexdigest()
@@ -480,6 +657,128 @@ def compute_fingerprint(path: Path):
 
 # ================= INGEST =================
 
+def analyze_one(job, lib, with_fingerprint=False):
+    """
+    Per-file work for analyze_files: tags, hash, fingerprint and
+    recommended path. Touches no database state, so it can run in a
+    worker process.
+
+    `job` is (path, stat_result, cached), where the stat comes from
+    iter_audio and cached is the (sha256, size_bytes, mtime) already
+    stored for this path or None; the hash is reused when size and
+    mtime are unchanged.
+    """
+    p, st, cached = job
+    meta = extract_tags(p)
+    if cached and cached[1] == st.st_size and cached[2] == st.st_mtime:
+        sha = cached[0]
+    else:
+        sha = sha256_file(p)
+    fp = compute_fingerprint(p) if with_fingerprint else None
+    rec = recommended_path_for(lib, meta, p.suffix)
+    return p, meta, sha, fp, rec, st.st_size, st.st_mtime
+
+
+def analyze_chunk(jobs, lib, with_fingerprint=False):
+    """analyze_one over a list of jobs, so each task amortizes IPC."""
+    return [analyze_one(job, lib, with_fingerprint) for job in jobs]
+
+
+def bounded_map(ex, fn, jobs, window, *args):
+    """
+    Like ex.map(fn, chunks, ...) but only keeps `window` tasks in
+    flight, topping up as results are consumed. Executor.map submits
+    the whole input up front, which would walk the entire tree and
+    hold every pending result before the first one is yielded.
+    Results come back in input order, one per job.
+    """
+    jobs = iter(jobs)
+    pending = deque()
+
+    def submit():
+        chunk = list(islice(jobs, ANALYZE_CHUNK_SIZE))
+        if chunk:
+            pending.append(ex.submit(fn, chunk, *args))
+
+    for _ in range(window):
+        submit()
+
+    while pending:
+        results = pending.popleft().result()
+        submit()
+        yield from results
+
+
+# Statements used by flush_file_rows, kept at module level so every
+# batch reuses the same text (and sqlite3's cached prepared statement)
+
+# UPSERT factual data (NEVER overwrites user intent)
+INSERT_FILE_SQL = """
+    INSERT INTO files (
+        original_path, sha256, size_bytes, mtime,
+        artist, album_artist, album, title, track, genre,
+        duration, bitrate, fingerprint,
+        is_compilation, recommended_path,
+        lifecycle_state,
+        first_seen, last_update
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(original_path) DO UPDATE SET
+        sha256=excluded.sha256,
+        size_bytes=excluded.size_bytes,
+        mtime=excluded.mtime,
+        artist=excluded.artist,
+        album_artist=excluded.album_artist,
+        album=excluded.album,
+        title=excluded.title,
+        track=excluded.track,
+        genre=excluded.genre,
+        duration=excluded.duration,
+        bitrate=excluded.bitrate,
+        fingerprint=excluded.fingerprint,
+        is_compilation=excluded.is_compilation,
+        recommended_path=excluded.recommended_path,
+        last_update=excluded.last_update
+    -- Leave unchanged rows alone: no page writes, last_update kept
+    WHERE files.sha256 IS NOT excluded.sha256
+       OR files.size_bytes IS NOT excluded.size_bytes
+       OR files.mtime IS NOT excluded.mtime
+       OR files.artist IS NOT excluded.artist
+       OR files.album_artist IS NOT excluded.album_artist
+       OR files.album IS NOT excluded.album
+       OR files.title IS NOT excluded.title
+       OR files.track IS NOT excluded.track
+       OR files.genre IS NOT excluded.genre
+       OR files.duration IS NOT excluded.duration
+       OR files.bitrate IS NOT excluded.bitrate
+       OR files.fingerprint IS NOT excluded.fingerprint
+       OR files.is_compilation IS NOT excluded.is_compilation
+       OR files.recommended_path IS NOT excluded.recommended_path
+"""
+
+# Initial actions for new files; ids are resolved in SQL, so
+# this must run after the upsert above
+INSERT_ACTION_SQL = """
+    INSERT INTO actions (
+        file_id, action, src_path, dst_path, created_at
+    )
+    SELECT id, 'move', ?, ?, ?
+    FROM files WHERE original_path=?
+"""
+
+
+def flush_file_rows(c, file_rows, action_rows):
+    """
+    Write buffered analysis results with one executemany per statement.
+    Both lists are cleared afterwards.
+    """
+    c.executemany(INSERT_FILE_SQL, file_rows)
+    c.executemany(INSERT_ACTION_SQL, action_rows)
+
+    file_rows.clear()
+    action_rows.clear()
+
+
 def analyze_files(
     src,
     lib,
@@ -489,114 +788,140 @@ def analyze_files(
     search_covers=False,
     only_states=None,
     exclude_states=None,
+    in_memory=False,
 ):
     conn = create_db(db_path)
+
+    # Optionally run the whole ingest against an in-memory copy and
+    # write it back in one sequential backup pass at the end. Nothing
+    # reaches disk until then, so an interrupted run leaves the
+    # previous database untouched (and saves none of its own work).
+    if in_memory:
+        disk = conn
+        conn = sqlite3.connect(":memory:")
+        disk.backup(conn)
+        disk.close()
+        conn.execute("PRAGMA foreign_keys = ON")
+
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
 
-    audio_list = [p for p in Path(src).rglob("*") if is_audio_file(p)]
-    log(f"Found {len(audio_list)} audio files")
+    # ------------------------------------------------------------
+    # Known files, loaded once so the state filters run before any
+    # expensive per-file work and unchanged files skip rehashing
+    # ------------------------------------------------------------
+    known_states = {}
+    known_hashes = {}
+    for r in c.execute("""
+        SELECT original_path, lifecycle_state, sha256, size_bytes, mtime
+        FROM files
+    """):
+        known_states[r["original_path"]] = r["lifecycle_state"]
+        known_hashes[r["original_path"]] = (
+            r["sha256"], r["size_bytes"], r["mtime"]
+        )
 
-    for p in maybe_progress(audio_list, "Analyzing", progress):
-        meta = extract_tags(p)
-        sha = sha256_file(p)
-        fp = compute_fingerprint(p) if with_fingerprint else None
-        rec = recommended_path_for(lib, meta, p.suffix)
-        now = utcnow()
-
-        # ------------------------------------------------------------
-        # Check if file already exists
-        # ------------------------------------------------------------
-        row = c.execute(
-            "SELECT id, lifecycle_state FROM files WHERE original_path=?",
-            (str(p),)
-        ).fetchone()
-
-        if row:
-            lifecycle = row["lifecycle_state"]
-
-            # --only-state filter
-            if only_states and lifecycle not in only_states:
-                continue
-
-            # --exclude-state filter
-            if exclude_states and lifecycle in exclude_states:
-                continue
-
-            is_new = False
-        else:
-            lifecycle = "new"
-            is_new = True
+    # Generator, so files are handed to the workers while the tree is
+    # still being walked instead of after a full listing
+    def jobs():
+        for p, st in iter_audio(src):
+            lifecycle = known_states.get(str(p))
+            if lifecycle is not None:
+                # --only-state filter
+                if only_states and lifecycle not in only_states:
+                    continue
+
+                # --exclude-state filter
+                if exclude_states and lifecycle in exclude_states:
+                    continue
+
+            yield p, st, known_hashes.get(str(p))
+
+    analyzed = 0
+    file_rows = []
+    action_rows = []
+
+    # On a first import, building the secondary index once at the end
+    # is cheaper than maintaining it on every insert. The UNIQUE index
+    # on original_path stays, since the upsert relies on it.
+    bulk_load = not known_states
+    if bulk_load:
+        c.execute("DROP INDEX IF EXISTS idx_files_lifecycle")
+
+    # Hashing, tag parsing and fingerprinting are independent per file
+    # and CPU-bound; they run in worker processes while this process
+    # does all the SQLite writes.
+    #
+    # Only a bounded window of tasks is in flight, so the walk, the
+    # hashing and the batched upserts all proceed together and memory
+    # stays flat regardless of library size.
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        results = bounded_map(
+            ex,
+            analyze_chunk,
+            jobs(),
+            workers * ANALYZE_WINDOW,
+            lib,
+            with_fingerprint,
+        )
 
-        # ------------------------------------------------------------
-        # UPSERT factual data (NEVER overwrites user intent)
-        # ------------------------------------------------------------
-        c.execute("""
-            INSERT INTO files (
-                original_path, sha256, size_bytes,
-                artist, album_artist, album, title, track, genre,
-                duration, bitrate, fingerprint,
-                is_compilation, recommended_path,
-                lifecycle_state,
-                first_seen, last_update
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(original_path) DO UPDATE SET
-                sha256=excluded.sha256,
-                size_bytes=excluded.size_bytes,
-                artist=excluded.artist,
-                album_artist=excluded.album_artist,
-                album=excluded.album,
-                title=excluded.title,
-                track=excluded.track,
-                genre=excluded.genre,
-                duration=excluded.duration,
-                bitrate=excluded.bitrate,
-                fingerprint=excluded.fingerprint,
-                is_compilation=excluded.is_compilation,
-                recommended_path=excluded.recommended_path,
-                last_update=excluded.last_update
-        """, (
-            str(p), sha, p.stat().st_size,
-            meta["artist"], meta["album_artist"],
-            meta["album"], meta["title"], meta["track"],
-            meta.get("genre"),
-            meta["duration"], meta["bitrate"], fp,
-            meta["is_compilation"], rec,
-            lifecycle,
-            now, now
-        ))
-
-        file_id = c.execute(
-            "SELECT id FROM files WHERE original_path=?",
-            (str(p),)
-        ).fetchone()[0]
-
-        # ------------------------------------------------------------
-        # Seed initial action ONLY for new files
-        # ------------------------------------------------------------
-        if is_new:
-            c.execute("""
-                INSERT INTO actions (
-                    file_id, action, src_path, dst_path, created_at
-                )
-                VALUES (?, 'move', ?, ?, ?)
-            """, (file_id, str(p), rec, now))
+        for p, meta, sha, fp, rec, size, mtime in maybe_progress(
+            results, "Analyzing", progress
+        ):
+            analyzed += 1
+            now = utcnow()
+            lifecycle = known_states.get(str(p))
+            is_new = lifecycle is None
+            if is_new:
+                lifecycle = "new"
+
+            file_rows.append((
+                str(p), sha, size, mtime,
+                meta["artist"], meta["album_artist"],
+                meta["album"], meta["title"], meta["track"],
+                meta.get("genre"),
+                meta["duration"], meta["bitrate"], fp,
+                meta["is_compilation"], rec,
+                lifecycle,
+                now, now
+            ))
 
-        # ------------------------------------------------------------
-        # Album art discovery (knowledge only)
-        # ------------------------------------------------------------
-        if search_covers:
-            file_row = c.execute("""
-                SELECT album_artist, album, is_compilation
-                FROM files WHERE id=?
-            """, (file_id,)).fetchone()
+            # Seed initial action ONLY for new files
+            if is_new:
+                action_rows.append((str(p), rec, now, str(p)))
 
-            ingest_album_art_for_file(c, file_row, p)
+            # ------------------------------------------------------------
+            # Album art discovery (knowledge only)
+            # ------------------------------------------------------------
+            if search_covers:
+                # Same values the upsert writes to the files row
+                ingest_album_art_for_file(c, meta, p)
+
+            if len(file_rows) >= UPSERT_BATCH_SIZE:
+                flush_file_rows(c, file_rows, action_rows)
+
+    flush_file_rows(c, file_rows, action_rows)
+
+    if bulk_load:
+        c.execute("""
+            CREATE INDEX IF NOT EXISTS idx_files_lifecycle
+                ON files(lifecycle_state)
+        """)
 
     conn.commit()
+
+    if in_memory:
+        log("Writing in-memory database to disk")
+        disk = sqlite3.connect(db_path)
+        conn.backup(disk)
+        conn.close()
+        conn = disk
+
+    # Refresh planner statistics for the indexes above
+    conn.execute("PRAGMA optimize")
     conn.close()
-    log("Analysis complete")
+    log("Analysis complete: %d audio files", analyzed)
 
 
 # ================= CLI =================
@@ -628,6 +953,11 @@ def main():
         "--exclude-state",
         help="Comma-separated lifecycle states to exclude (e.g. applied,locked)"
     )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Ingest into an in-memory copy of the DB and write it back at the end"
+    )
 
     args = parser.parse_args()
 
@@ -654,6 +984,7 @@ def main():
         search_covers=args.search_covers,
         only_states=only_states,
         exclude_states=exclude_states,
+        in_memory=args.in_memory,
     )
 
     # ------------------------------------------------------------
@@ -665,7 +996,7 @@ def main():
             from genre_normalizer_cli import main as genre_cli_main
             genre_cli_main(db_path=db_path)
         except Exception as e:
-            log(f"[ERROR] Genre normalization failed: {e}")
+            log("[ERROR] Genre normalization failed: %s", e)
 
 
 
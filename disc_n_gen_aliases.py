@@ -5,15 +5,16 @@
 # generates aliases for artists and albums, and finds duplicate files based on metadata and file content.
 # It outputs the results to JSON files for further processing or review.
 # Ensure you have the required libraries installed:
-# pip install mutagen
-# Usage: python disc_n_gen_aliases.py <music_dir> --mode [aliases|duplicates|all] [--verbose]
+# pip install mutagen rapidfuzz
+# Optional: pip install blake3 orjson (faster content hashing and JSON output)
+# Usage: python disc_n_gen_aliases.py <music_dir> --mode [aliases|duplicates|all] [--workers N] [--cache] [--verbose]
 # Example: python disc_n_gen_aliases.py /path/to/music --mode all --verbose
 # The script supports various audio formats and normalizes names for better matching.
 # It can be used to clean up music libraries by identifying duplicates and standardizing artist/album names.
 # The output files are artist_album_aliases.json and duplicates.json.
 # Adjust the SIMILARITY_THRESHOLD and SUPPORTED_EXTS as needed for your use case.
 # The script is designed to be run from the command line and can handle large music collections efficiently.
-# It uses hashing to compare files and difflib for string similarity checks.
+# It uses hashing to compare files and rapidfuzz for string similarity checks.
 # Make sure to run it in an environment where you have read access to the music directory.
 # The script is compatible with Python 3 and requires the Mutagen library for audio file handling.
 # It is a standalone script and does not require any additional configuration files.
@@ -29,42 +30,115 @@
 import os
 import sys
 import json
+import sqlite3
 import re
 import hashlib
+import mmap
 import unicodedata
-import difflib
-from mutagen import File as MutagenFile
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from rapidfuzz import fuzz, process
 
-SUPPORTED_EXTS = ['.mp3', '.flac', '.wav', '.m4a', '.ogg', '.aac']
+# Optional: BLAKE3 is several times faster than SHA-256 and hashes are
+# only compared within a single run, so any content hash will do
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# Optional: orjson writes the same JSON as json.dump(indent=2,
+# ensure_ascii=False), serialized in C
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SUPPORTED_EXTS = frozenset({'.mp3', '.flac', '.wav', '.m4a', '.ogg', '.aac'})
 SIMILARITY_THRESHOLD = 0.87
 VERBOSE = False
+# Threads reading and hashing files; 2-4 suit spinning disks, NVMe likes more
+MAX_WORKERS = (os.cpu_count() or 1) * 2
+HASH_ALGO = 'blake3' if blake3 else 'sha256'
+MMAP_MIN_SIZE = 1 << 20  # hash files above 1 MiB through mmap
+# Scan cache used with --cache (tags and hashes keyed by path, size, mtime)
+CACHE_PATH = ".music_cache.sqlite"
+# Bytes hashed from each end of a file for its quick fingerprint
+QUICK_SAMPLE_SIZE = 1 << 16
+# Keys scored per cdist call in build_aliases
+BLOCK_ROWS = 256
+
+# normalize_string patterns, compiled once
+# Leading track number, or text within parentheses or brackets
+JUNK_RE = re.compile(r'^\d+\s*[-._)]*\s*|\(.*?\)|\[.*?\]')
+NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
 
 def log(msg):
     if VERBOSE:
         print(msg)
 
+def write_json(path, data):
+    # Write data as indented UTF-8 JSON, with orjson when it is installed
+    if orjson:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+@lru_cache(maxsize=None)
+def combining_table():
+    # str.translate table deleting every combining character, so they are
+    # stripped in C instead of a per-character Python loop. Built on first
+    # use, since scanning all code points takes ~0.1 s.
+    return {
+        cp: None for cp in range(0x110000)
+        if unicodedata.combining(chr(cp))
+    }
+
+# Artist/album/title values repeat across a library, so cache results
+@lru_cache(maxsize=1 << 16)
 def normalize_string(s):
     # Convert the string to lowercase
     s = s.lower()
-    # Normalize the string to decompose any combined characters
-    s = unicodedata.normalize('NFKD', s)
-    # Remove any combining characters
-    s = ''.join(c for c in s if not unicodedata.combining(c))
-    # Remove any numbers, spaces, and punctuation at the beginning of the string
-    s = re.sub(r'^\d+\s*[-._)]*\s*', '', s)
-    # Remove any text within parentheses or brackets
-    s = re.sub(r'\(.*?\)|\[.*?\]', '', s)
+    # ASCII has nothing to decompose, so only the regex steps apply
+    if not s.isascii():
+        # Normalize the string to decompose any combined characters
+        s = unicodedata.normalize('NFKD', s)
+        # Remove any combining characters
+        s = s.translate(combining_table())
+    # Remove any numbers, spaces, and punctuation at the beginning of the
+    # string, and any text within parentheses or brackets, in one pass
+    s = JUNK_RE.sub('', s)
     # Remove any characters that are not letters, numbers, or spaces
-    s = re.sub(r'[^a-z0-9 ]+', '', s)
-    # Replace any multiple spaces with a single space
-    s = re.sub(r'\s+', ' ', s)
-    # Remove any leading or trailing spaces
-    return s.strip()
+    s = NON_ALNUM_RE.sub('', s)
+    # Collapse runs of spaces and trim both ends in one pass; only plain
+    # spaces are left at this point, so split() needs no regex
+    return ' '.join(s.split())
+
+@lru_cache(maxsize=None)
+def tag_readers():
+    # Imported on first use so the usage message and argument errors do
+    # not pay for loading mutagen's format registry
+    from mutagen.easymp4 import EasyMP4
+    from mutagen.flac import FLAC
+    from mutagen.mp3 import EasyMP3
+    # Extension -> mutagen class, so common formats skip format sniffing
+    return {'.mp3': EasyMP3, '.flac': FLAC, '.m4a': EasyMP4}
 
 def get_tags(filepath):
+    from mutagen import File as MutagenFile
+
     # Try to read the tags from the given file
     try:
-        audio = MutagenFile(filepath, easy=True)
+        reader = tag_readers().get(os.path.splitext(filepath)[1].lower())
+        try:
+            audio = reader(filepath) if reader else None
+        except Exception:
+            # Misnamed file: fall back to content sniffing below
+            audio = None
+        if audio is None:
+            audio = MutagenFile(filepath, easy=True)
         # If the file is not valid, return an empty dictionary
         if not audio:
             return {}
@@ -79,13 +153,29 @@ def get_tags(filepath):
         log(f"  [!] Failed to read tags for {filepath}: {e}")
         return {}
 
-def calculate_hash(filepath, algo='sha256', block_size=65536):
+def calculate_hash(filepath, algo=HASH_ALGO, block_size=65536):
     # Try to calculate the hash of the file
     try:
-        # Create a new hash object using the specified algorithm
-        h = hashlib.new(algo)
-        # Open the file in binary mode
-        with open(filepath, 'rb') as f:
+        if algo == 'blake3':
+            # Multithreaded, SIMD hashing straight from a memory map
+            return blake3(max_threads=blake3.AUTO).update_mmap(filepath).hexdigest()
+        # Open the file in binary mode, without Python-level buffering
+        with open(filepath, 'rb', buffering=0) as f:
+            # Create a new hash object using the specified algorithm
+            h = hashlib.new(algo)
+            # Map larger files and hash them in one update() call, which
+            # runs entirely in C with the GIL released
+            if os.fstat(f.fileno()).st_size > MMAP_MIN_SIZE:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        h.update(mm)
+                    return h.hexdigest()
+                except (OSError, ValueError):
+                    # Not mappable, use a regular read below
+                    pass
+            # On Python 3.11+ let hashlib drive the read loop itself
+            if hasattr(hashlib, 'file_digest'):
+                return hashlib.file_digest(f, algo).hexdigest()
             # Iterate over the file in chunks of the specified block size
             for chunk in iter(lambda: f.read(block_size), b''):
                 # Update the hash object with the chunk
@@ -97,48 +187,173 @@ def calculate_hash(filepath, algo='sha256', block_size=65536):
         log(f"  [!] Hashing failed for {filepath}: {e}")
         return None
 
-def scan_music_files(root_path):
+def open_cache(path=CACHE_PATH):
+    # Open (or create) the scan cache database
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_cache (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            algo TEXT,
+            tags TEXT,
+            quick TEXT,
+            hash TEXT
+        )
+    """)
+    return conn
+
+def load_cache(conn):
+    # Load every cached row into a dictionary keyed by path
+    rows = conn.execute("""
+        SELECT path, size, mtime_ns, algo, tags, quick, hash
+        FROM file_cache
+    """)
+    return {row[0]: row[1:] for row in rows}
+
+def save_cache(conn, files):
+    # Store the results of this run, including any full hashes computed
+    # by find_duplicates, in a single transaction
+    conn.executemany("""
+        INSERT INTO file_cache (path, size, mtime_ns, algo, tags, quick, hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            size=excluded.size,
+            mtime_ns=excluded.mtime_ns,
+            algo=excluded.algo,
+            tags=excluded.tags,
+            quick=excluded.quick,
+            hash=excluded.hash
+    """, (
+        (f["path"], f["size"], f["mtime_ns"], HASH_ALGO,
+         json.dumps(f["tags"], ensure_ascii=False), f["quick"], f["hash"])
+        for f in files if f["size"] is not None
+    ))
+    conn.commit()
+
+def read_music_file(full_path, cached=None):
+    # Get the file name from the full path
+    fname = os.path.basename(full_path)
+    # Stat the file; size and mtime decide whether cached results still apply
+    try:
+        st = os.stat(full_path)
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+    except OSError:
+        size = mtime_ns = None
+    if cached and size is not None and tuple(cached[:3]) == (size, mtime_ns, HASH_ALGO):
+        # Unchanged since the last run: reuse tags and hashes from the cache
+        tags = json.loads(cached[3])
+        quick, hash_val = cached[4], cached[5]
+    else:
+        # Extract tags from the file using Mutagen
+        tags = get_tags(full_path)
+        # Cheap size + head/tail fingerprint; the full content hash is
+        # only computed by find_duplicates when fingerprints collide
+        quick, hash_val = quick_fingerprint(full_path), None
+    # Return the file data: tags, content fingerprint and normalized file name
+    return {
+        "path": full_path,
+        "name": fname,
+        # Normalize the filename for fuzzy comparison
+        "norm_name": normalize_string(fname),
+        "tags": tags,
+        # Normalize the tags once here instead of in every comparison
+        "norm_tags": {k: normalize_string(v) for k, v in tags.items()},
+        "quick": quick,
+        "hash": hash_val,
+        "size": size,
+        "mtime_ns": mtime_ns
+    }
+
+def list_music_dir(path):
+    # List one directory with os.scandir; DirEntry type checks reuse the
+    # directory listing, so most entries cost no extra stat call
+    subdirs, paths = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Symlinked directories are not followed
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                # Check the extension before is_file(), which may stat
+                elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTS and entry.is_file():
+                    paths.append(entry.path)
+    except OSError:
+        # Skip directories that cannot be listed, as os.walk does
+        pass
+    # Return the subdirectories to visit and the music files found
+    return subdirs, paths
+
+def iter_music_paths(root_path, workers=MAX_WORKERS):
+    # List directories on a thread pool, so slow listings (network mounts,
+    # spinning disks) overlap; each finished listing queues its subdirs
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(list_music_dir, root_path)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, paths = future.result()
+                pending.update(executor.submit(list_music_dir, d) for d in subdirs)
+                # Yield the full paths of the music files
+                yield from paths
+
+def list_subdirs(path):
+    # Return the names of the directories directly inside path
+    try:
+        with os.scandir(path) as it:
+            return [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return []
+
+def quick_fingerprint(filepath, sample_size=QUICK_SAMPLE_SIZE):
+    # Try to fingerprint the file from its size and its first and last bytes
+    try:
+        with open(filepath, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            h = blake3() if blake3 else hashlib.new(HASH_ALGO)
+            # Hash the head of the file
+            h.update(f.read(sample_size))
+            # Hash the tail too, unless the head already covered it
+            if size > sample_size:
+                f.seek(max(sample_size, size - sample_size))
+                h.update(f.read(sample_size))
+        # Files with different fingerprints can never have the same content
+        return f"{size}:{h.hexdigest()}"
+    # If an exception is raised, log the error and return None
+    except Exception as e:
+        log(f"  [!] Fingerprinting failed for {filepath}: {e}")
+        return None
+
+def scan_music_files(root_path, workers=MAX_WORKERS, cache=None):
     # Initialize a list to store file metadata dictionaries
     files = []
+    # Results of the previous run, if a cache is in use
+    cached = load_cache(cache) if cache else {}
     # Initialize dictionaries to store variants of artist and album names
     artist_variants = {}
     album_variants = {}
 
-    # Walk through all files in the directory tree rooted at root_path
-    for dirpath, _, filenames in os.walk(root_path):
-        for fname in filenames:
-            # Get the lowercase file extension
-            ext = os.path.splitext(fname)[1].lower()
-            # Skip files with unsupported extensions
-            if ext not in SUPPORTED_EXTS:
-                continue
-
-            # Construct the full path of the file
-            full_path = os.path.join(dirpath, fname)
-            # Extract tags from the file using Mutagen
-            tags = get_tags(full_path)
-            # Compute the SHA-256 hash of the file for content-based comparison
-            hash_val = calculate_hash(full_path)
-            # Normalize the filename for fuzzy comparison
-            norm_name = normalize_string(fname)
-
+    # Read tags and hash files on a thread pool; both are dominated by
+    # I/O and hashing, which release the GIL, so threads overlap them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            lambda path: read_music_file(path, cached.get(path)),
+            iter_music_paths(root_path, workers)
+        )
+        for file_data in results:
+            tags = file_data["tags"]
+            norm_tags = file_data["norm_tags"]
             # Append file data to the list
-            files.append({
-                "path": full_path,
-                "name": fname,
-                "norm_name": norm_name,
-                "tags": tags,
-                "hash": hash_val
-            })
+            files.append(file_data)
 
             # Collect all artist name variants (raw and normalized) found in tags
             if tags.get("artist"):
-                norm_artist = normalize_string(tags["artist"])
-                artist_variants.setdefault(norm_artist, set()).add(tags["artist"])
+                artist_variants.setdefault(norm_tags["artist"], set()).add(tags["artist"])
             # Collect all album name variants (raw and normalized) found in tags
             if tags.get("album"):
-                norm_album = normalize_string(tags["album"])
-                album_variants.setdefault(norm_album, set()).add(tags["album"])
+                album_variants.setdefault(norm_tags["album"], set()).add(tags["album"])
 
     # Return the collected file data and artist/album variants
     return files, artist_variants, album_variants
@@ -149,57 +364,66 @@ def scan_folder_structure(root_path):
     artist_variants = {}
     album_variants = {}
 
-    # Walk through the folder hierarchy of root_path
-    for dirpath, _, _ in os.walk(root_path):
-        # Get the path relative to root_path
-        rel_path = os.path.relpath(dirpath, root_path)
-        # Skip the root directory itself
-        if rel_path == ".":
-            continue
-        # Split the relative path into directory levels (artist/album)
-        parts = rel_path.split(os.sep)
-        # If there's only one folder level, treat it as an artist
-        if len(parts) == 1 and parts[0].lower() != "collections":
-            norm_artist = normalize_string(parts[0])
-            artist_variants.setdefault(norm_artist, set()).add(parts[0])
-        # If there are two levels, treat them as artist/album
-        if len(parts) == 2:
-            norm_album = normalize_string(parts[1])
-            album_variants.setdefault(norm_album, set()).add(parts[1])
-            # Also handle the artist part if not under a "collections" folder
-            if parts[0].lower() != "collections":
-                norm_artist = normalize_string(parts[0])
-                artist_variants.setdefault(norm_artist, set()).add(parts[0])
+    # Only the first two folder levels (artist/album) carry names, so list
+    # just those instead of walking the whole tree
+    for artist in list_subdirs(root_path):
+        # Treat first-level folders as artists, unless it is a "collections" folder
+        if artist.lower() != "collections":
+            norm_artist = normalize_string(artist)
+            artist_variants.setdefault(norm_artist, set()).add(artist)
+        # Treat second-level folders as albums
+        for album in list_subdirs(os.path.join(root_path, artist)):
+            norm_album = normalize_string(album)
+            album_variants.setdefault(norm_album, set()).add(album)
 
     # Return the collected folder-based artist/album variants
     return artist_variants, album_variants
 
 
+def find_root(parent, i):
+    # Union-find lookup: follow parents to the root, halving the path
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
 def build_aliases(variants_dict, threshold=SIMILARITY_THRESHOLD):
-    # Create a set to keep track of keys we've already processed
-    seen = set()
     # Dictionary to store the final alias mapping
     aliases = {}
-    # Get all normalized keys from the variants dictionary
-    keys = list(variants_dict.keys())
+    # Get all normalized keys from the variants dictionary, shortest first
+    keys = sorted(variants_dict, key=len)
+    lengths = [len(k) for k in keys]
+    # Union-find forest over key indexes; similar keys end up in one tree
+    parent = list(range(len(keys)))
 
-    # Iterate through each normalized key
+    # fuzz.ratio is at most 2*len(a)/(len(a)+len(b)), so a key can only
+    # reach the threshold against keys at most this factor longer
+    max_growth = (2 - threshold) / threshold
+
+    # Score blocks of keys at a time with rapidfuzz's cdist (C++, all
+    # cores), which bounds memory to BLOCK_ROWS x window scores
+    for start in range(0, len(keys), BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, len(keys))
+        # Columns: the block itself plus the longer keys that can still
+        # match its longest key
+        col_stop = bisect_right(lengths, lengths[stop - 1] * max_growth + 1e-9, stop)
+        scores = process.cdist(
+            keys[start:stop], keys[start:col_stop], scorer=fuzz.ratio,
+            score_cutoff=threshold * 100, workers=-1
+        )
+        # Scores below the cutoff are 0; merge the trees of all matches
+        rows, cols = scores.nonzero()
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            if c > r:
+                parent[find_root(parent, start + c)] = find_root(parent, start + r)
+
+    # Collect all original variants of each group of similar keys
+    groups = {}
     for i, key in enumerate(keys):
-        if key in seen:
-            continue
-        # Start a group with the current key
-        group = [key]
-        # Use difflib to find similar normalized strings
-        matches = difflib.get_close_matches(key, keys, n=10, cutoff=threshold)
-        for match in matches:
-            # Avoid reprocessing already-seen keys
-            if match != key and match not in seen:
-                group.append(match)
-        # Collect all original variants from the grouped keys
-        combined = set()
-        for g in group:
-            combined.update(variants_dict.get(g, []))
-            seen.add(g)
+        groups.setdefault(find_root(parent, i), set()).update(variants_dict[key])
+
+    for combined in groups.values():
         # Choose the longest variant as the canonical (more descriptive) name
         canonical = sorted(combined, key=len)[-1]
         # Map all other variants to the canonical name
@@ -210,6 +434,114 @@ def build_aliases(variants_dict, threshold=SIMILARITY_THRESHOLD):
     return aliases
 
 
+def are_files_similar(f1, f2, threshold=SIMILARITY_THRESHOLD):
+    # Identical content is always a duplicate
+    if f1["hash"] and f1["hash"] == f2["hash"]:
+        return True
+    # Compare the normalized artist and title tags
+    t1, t2 = f1["norm_tags"], f2["norm_tags"]
+    artist1, artist2 = t1.get("artist", ""), t2.get("artist", "")
+    title1, title2 = t1.get("title", ""), t2.get("title", "")
+    if not (artist1 and title1) or artist1 != artist2 or title1 != title2:
+        return False
+    # Same track according to the tags; require similar file names too,
+    # as a guard against files that were tagged carelessly
+    name1, name2 = f1["norm_name"], f2["norm_name"]
+    # Common cases first: equal names, or lengths too far apart for the
+    # ratio (at most 2*shorter/(len1+len2)) to reach the threshold
+    if name1 == name2:
+        return True
+    if 2 * min(len(name1), len(name2)) < threshold * (len(name1) + len(name2)):
+        return False
+    # (score_cutoff lets rapidfuzz stop early on clearly different names)
+    cutoff = threshold * 100
+    return fuzz.ratio(name1, name2, score_cutoff=cutoff) >= cutoff
+
+
+def group_similar_names(ids, names, threshold=SIMILARITY_THRESHOLD):
+    # Score every pair of names in one native call (C++, all cores);
+    # scores below the cutoff come back as 0
+    scores = process.cdist(
+        names, names, scorer=fuzz.ratio,
+        score_cutoff=threshold * 100, workers=-1
+    )
+    # Join similar names with a union-find
+    parent = list(range(len(names)))
+    rows, cols = scores.nonzero()
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        if c > r:
+            parent[find_root(parent, c)] = find_root(parent, r)
+    # Collect the ids of each group of connected names
+    groups = {}
+    for k, i in enumerate(ids):
+        groups.setdefault(find_root(parent, k), []).append(i)
+    # Return the groups with more than one member
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def find_duplicates(files, threshold=SIMILARITY_THRESHOLD):
+    # List of duplicate groups, each a list of file paths
+    duplicates = []
+    # Indexes of files already placed in a group
+    grouped = set()
+
+    # Bucket files by quick fingerprint first; only files sharing one
+    # can be identical, so only those are read in full and hashed
+    by_quick = {}
+    for i, f in enumerate(files):
+        if f["quick"]:
+            by_quick.setdefault(f["quick"], []).append(i)
+    for members in by_quick.values():
+        if len(members) > 1:
+            for i in members:
+                # Cached hashes are reused
+                if files[i]["hash"] is None:
+                    files[i]["hash"] = calculate_hash(files[i]["path"])
+
+    # Bucket files by content hash; every bucket with more than one
+    # member is a duplicate group without any string comparison
+    by_hash = {}
+    for i, f in enumerate(files):
+        if f["hash"]:
+            by_hash.setdefault(f["hash"], []).append(i)
+    for members in by_hash.values():
+        if len(members) > 1:
+            duplicates.append([files[i]["path"] for i in members])
+            grouped.update(members)
+
+    # Bucket the remaining files by normalized (artist, title), so the
+    # fuzzy check only runs inside small buckets instead of on all pairs
+    by_key = {}
+    for i, f in enumerate(files):
+        if i in grouped:
+            continue
+        artist = f["norm_tags"].get("artist", "")
+        title = f["norm_tags"].get("title", "")
+        # Untagged files can only match by hash
+        if artist and title:
+            by_key.setdefault((artist, title), []).append(i)
+
+    for members in by_key.values():
+        if len(members) < 2:
+            continue
+        if len(members) == 2:
+            # The common case: a single pair
+            similar = are_files_similar(files[members[0]], files[members[1]], threshold)
+            groups = [members] if similar else []
+        else:
+            # Score all file names in the bucket with one cdist call
+            groups = group_similar_names(
+                members, [files[i]["norm_name"] for i in members], threshold
+            )
+        for group in groups:
+            grouped.update(group)
+            duplicates.append([files[k]["path"] for k in group])
+            log(f"  [=] Duplicate group: {[files[k]['name'] for k in group]}")
+
+    # Return the list of duplicate groups
+    return duplicates
+
+
 def merge_variants(dict1, dict2):
     # Create a copy of dict1 to start with
     merged = dict1.copy()
@@ -231,7 +563,7 @@ def main():
     # Check if the user has provided the correct number of arguments
     if len(sys.argv) < 3:
         # Print the correct usage of the script
-        print("Usage: python disc_n_gen_aliases.py <music_dir> --mode [aliases|duplicates|all] [--verbose]")
+        print("Usage: python disc_n_gen_aliases.py <music_dir> --mode [aliases|duplicates|all] [--workers N] [--cache] [--verbose]")
         # Exit the script with a status code of 1
         sys.exit(1)
 
@@ -249,6 +581,14 @@ def main():
         if mode_index + 1 < len(args):
             # Set the mode to the provided mode
             mode = args[mode_index + 1].lower()
+    # Set the number of scanning threads, tuned for the disk (2-4 on HDD, 16+ on NVMe)
+    workers = MAX_WORKERS
+    if "--workers" in args:
+        workers_index = args.index("--workers")
+        if workers_index + 1 < len(args) and args[workers_index + 1].isdigit():
+            workers = max(1, int(args[workers_index + 1]))
+    # Reuse tags and hashes of unchanged files from the previous run
+    cache = open_cache() if "--cache" in args else None
     # Set the VERBOSE variable to True if the user has provided the --verbose argument
     VERBOSE = "--verbose" in args
 
@@ -261,7 +601,7 @@ def main():
         print("[*] Verbose mode ON")
 
     # Scan the music files in the root directory
-    files, tag_artists, tag_albums = scan_music_files(root_dir)
+    files, tag_artists, tag_albums = scan_music_files(root_dir, workers, cache)
     # Scan the folder structure in the root directory
     folder_artists, folder_albums = scan_folder_structure(root_dir)
     # Merge the variants from the tag and folder structure
@@ -276,13 +616,28 @@ def main():
         artist_aliases = build_aliases(artist_variants)
         album_aliases = build_aliases(album_variants)
         # Write the artist/album aliases to a JSON file
-        with open("artist_album_aliases.json", "w", encoding="utf-8") as f:
-            json.dump({
-                "artist_aliases": artist_aliases,
-                "album_aliases": album_aliases
-            }, f, indent=2, ensure_ascii=False)
+        write_json("artist_album_aliases.json", {
+            "artist_aliases": artist_aliases,
+            "album_aliases": album_aliases
+        })
         # Print that the aliases have been written to the JSON file
         print(f"[✓] Aliases written to artist_album_aliases.json")
 
+    # Check if the mode is "duplicates" or "all"
+    if mode in ("duplicates", "all"):
+        # Print that duplicate files are being searched for
+        print("[*] Finding duplicate files...")
+        duplicates = find_duplicates(files)
+        # Write the duplicate groups to a JSON file
+        write_json("duplicates.json", duplicates)
+        # Print how many duplicate groups were written to the JSON file
+        print(f"[✓] {len(duplicates)} duplicate groups written to duplicates.json")
+
+    # Save this run's results for the next one
+    if cache:
+        save_cache(cache, files)
+        cache.close()
+        print(f"[✓] Scan cache updated: {CACHE_PATH}")
+
 if __name__ == "__main__":
     main()
@@ -12,15 +12,23 @@ This module is a pure worker:
 """
 
 import os
+import errno
 import sqlite3
 import argparse
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Rows applied per commit, and the longest time between two commits
+COMMIT_BATCH_SIZE = 500
+COMMIT_INTERVAL = 1.0  # seconds
+
 
 # -------------------- helpers --------------------
 
@@ -35,27 +43,201 @@ def log(msg):
 def connect_db(db_path):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    # WAL: one log append per commit instead of journal + db fsyncs
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Wait for other pipeline tools instead of failing with "locked"
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
     return conn
 
 
-def ensure_parent(path: Path):
-    path.parent.mkdir(parents=True, exist_ok=True)
+# Parent directories already created in this run; workers share it
+_created_parents = set()
+# Destinations taken by an action in this run; see claim_destination
+_claimed_destinations = set()
+_lock = threading.Lock()
+
+
+def ensure_parent(path):
+    parent = os.path.dirname(path)
+    if parent:
+        with _lock:
+            if parent in _created_parents:
+                return
+        # exist_ok also covers two workers creating the same directory
+        os.makedirs(parent, exist_ok=True)
+        with _lock:
+            _created_parents.add(parent)
+
+
+def fast_move(src, dst):
+    """
+    Rename when src and dst share a filesystem (one syscall, no data
+    copied); only cross-device moves fall back to shutil.move's
+    copy + unlink. Callers have already checked that dst is free.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+def claim_destination(dst):
+    """
+    Reserve dst for one action. Moves run concurrently, so the
+    os.path.exists() check alone could let two actions with the same
+    destination both pass before either file lands there.
+    """
+    with _lock:
+        if dst in _claimed_destinations:
+            return False
+        _claimed_destinations.add(dst)
+        return True
+
+
+def dependent_chains(rows):
+    """
+    Split rows into chains of actions that must run in order: rows that
+    share a file_id, or where one row's path is another's src/dst
+    (x → y then y → z), land in the same chain. Rows keep their
+    ORDER BY a.id order inside a chain; separate chains touch disjoint
+    files and paths, so they can run concurrently.
+    """
+    parent = {}
+
+    def find(k):
+        parent.setdefault(k, k)
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for r in rows:
+        keys = [("file", r["file_id"]), ("path", r["src_path"])]
+        if r["dst_path"]:
+            keys.append(("path", r["dst_path"]))
+        root = find(keys[0])
+        for k in keys[1:]:
+            parent[find(k)] = root
+
+    chains = {}
+    for r in rows:
+        chains.setdefault(find(("file", r["file_id"])), []).append(r)
+    return list(chains.values())
 
 
 # -------------------- executor core --------------------
 
+def apply_action(r, archive_root, trash_root, dry_run):
+    """
+    Filesystem side of one action. Does no database I/O, so it can run
+    on a worker thread; returns the file's new path (None if it did
+    not move) or raises with the error to record.
+    """
+    action = r["action"]
+    src = r["src_path"]
+
+    if not os.path.exists(src):
+        raise RuntimeError(f"missing_source: {src}")
+
+    # ---------------- MOVE ----------------
+    if action == "move":
+        if not r["dst_path"]:
+            raise RuntimeError("move_without_dst_path")
+
+        dst = r["dst_path"]
+        ensure_parent(dst)
+
+        if os.path.exists(dst) or not claim_destination(dst):
+            raise RuntimeError(f"destination_exists: {dst}")
+
+        log(f"[MOVE] {src} → {dst}")
+
+    # ---------------- ARCHIVE ----------------
+    elif action == "archive":
+        if not archive_root:
+            raise RuntimeError("archive_root_not_provided")
+
+        dst = os.path.join(
+            archive_root, f"{r['file_id']}_{os.path.basename(src)}"
+        )
+        ensure_parent(dst)
+
+        if os.path.exists(dst) or not claim_destination(dst):
+            raise RuntimeError(f"archive_destination_exists: {dst}")
+
+        log(f"[ARCHIVE] {src} → {dst}")
+
+    # ---------------- DELETE (SOFT) ----------------
+    elif action == "delete":
+        dst = os.path.join(
+            trash_root, f"{r['file_id']}_{os.path.basename(src)}"
+        )
+        ensure_parent(dst)
+
+        if os.path.exists(dst) or not claim_destination(dst):
+            raise RuntimeError(f"trash_destination_exists: {dst}")
+
+        log(f"[TRASH] {src} → {dst}")
+
+    # ---------------- SKIP ----------------
+    elif action == "skip":
+        log(f"[SKIP] {src}")
+        return None
+
+    else:
+        raise RuntimeError(f"unknown_action: {action}")
+
+    if dry_run:
+        return None
+
+    fast_move(src, dst)
+    # src is free again; a later action in the same chain may target it
+    with _lock:
+        _claimed_destinations.discard(src)
+    return dst
+
+
+def apply_chain(chain, archive_root, trash_root, dry_run):
+    """
+    Apply one chain of dependent actions in id order on the calling
+    worker. Returns (row, new_path, error) per action; an error does
+    not stop the chain, matching the sequential executor.
+    """
+    results = []
+    for r in chain:
+        try:
+            results.append(
+                (r, apply_action(r, archive_root, trash_root, dry_run), None)
+            )
+        except Exception as e:
+            results.append((r, None, e))
+    return results
+
+
 def execute_actions(
     db_path,
     archive_root=None,
     trash_root="to_trash",
     dry_run=True,
     limit=None,
+    workers=8,
 ):
     conn = connect_db(db_path)
     c = conn.cursor()
 
-    archive_root = Path(archive_root).resolve() if archive_root else None
-    trash_root = Path(trash_root).resolve()
+    # Claims and created parents only hold for a single run
+    _created_parents.clear()
+    _claimed_destinations.clear()
+
+    # Paths stay plain strings in the row loop; Path objects are only
+    # built once here.
+    archive_root = str(Path(archive_root).resolve()) if archive_root else None
+    trash_root = str(Path(trash_root).resolve())
 
     query = """
         SELECT
@@ -86,115 +268,83 @@ def execute_actions(
         "error": 0,
     }
 
-    for r in rows:
-        action_id = r["action_id"]
-        action = r["action"]
-        src = Path(r["src_path"])
+    # Filesystem work runs on a thread pool (moves are I/O-bound, and
+    # cross-device moves are full copies); all database updates stay
+    # on this thread, since the connection is not shared. Actions that
+    # depend on each other go to one worker as a chain, in id order.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(apply_chain, chain, archive_root, trash_root, dry_run)
+            for chain in dependent_chains(rows)
+        ]
+
+        # Commit in batches instead of once per row; each row runs in
+        # its own savepoint so a failing row only undoes its own updates
+        uncommitted = 0
+        last_commit = time.monotonic()
 
         try:
-            if not src.exists():
-                raise RuntimeError(f"missing_source: {src}")
-
-            # ---------------- MOVE ----------------
-            if action == "move":
-                if not r["dst_path"]:
-                    raise RuntimeError("move_without_dst_path")
-
-                dst = Path(r["dst_path"])
-                ensure_parent(dst)
-
-                if dst.exists():
-                    raise RuntimeError(f"destination_exists: {dst}")
-
-                log(f"[MOVE] {src} → {dst}")
-                if not dry_run:
-                    shutil.move(src, dst)
-
-                if not dry_run:
-                    c.execute("""
-                        UPDATE files
-                        SET original_path=?, last_update=?
-                        WHERE id=?
-                    """, (str(dst), utcnow(), r["file_id"]))
-
-                summary["move"] += 1
-
-            # ---------------- ARCHIVE ----------------
-            elif action == "archive":
-                if not archive_root:
-                    raise RuntimeError("archive_root_not_provided")
-
-                dst = archive_root / f"{r['file_id']}_{src.name}"
-                ensure_parent(dst)
-
-                if dst.exists():
-                    raise RuntimeError(f"archive_destination_exists: {dst}")
-
-                log(f"[ARCHIVE] {src} → {dst}")
-                if not dry_run:
-                    shutil.move(src, dst)
-
-                if not dry_run:
-                    c.execute("""
-                        UPDATE files
-                        SET original_path=?, last_update=?
-                        WHERE id=?
-                    """, (str(dst), utcnow(), r["file_id"]))
-
-                summary["archive"] += 1
-
-            # ---------------- DELETE (SOFT) ----------------
-            elif action == "delete":
-                dst = trash_root / f"{r['file_id']}_{src.name}"
-                ensure_parent(dst)
-
-                if dst.exists():
-                    raise RuntimeError(f"trash_destination_exists: {dst}")
-
-                log(f"[TRASH] {src} → {dst}")
-                if not dry_run:
-                    shutil.move(src, dst)
-
-                if not dry_run:
-                    c.execute("""
-                        UPDATE files
-                        SET original_path=?, last_update=?
-                        WHERE id=?
-                    """, (str(dst), utcnow(), r["file_id"]))
-
-                summary["delete"] += 1
-
-            # ---------------- SKIP ----------------
-            elif action == "skip":
-                log(f"[SKIP] {src}")
-                summary["skip"] += 1
-
-            else:
-                raise RuntimeError(f"unknown_action: {action}")
-
-            # ---------------- ACTION STATE ----------------
-            if not dry_run:
-                c.execute("""
-                    UPDATE actions
-                    SET status='applied', applied_at=?
-                    WHERE id=?
-                """, (utcnow(), action_id))
-
+            for future in as_completed(futures):
+                for r, dst, error in future.result():
+                    action_id = r["action_id"]
+
+                    if not conn.in_transaction:
+                        c.execute("BEGIN")
+                    c.execute("SAVEPOINT action_row")
+
+                    try:
+                        if error is not None:
+                            raise error
+
+                        if dst is not None:
+                            c.execute("""
+                                UPDATE files
+                                SET original_path=?, last_update=?
+                                WHERE id=?
+                            """, (dst, utcnow(), r["file_id"]))
+
+                        summary[r["action"]] += 1
+
+                        # ---------------- ACTION STATE ----------------
+                        if not dry_run:
+                            c.execute("""
+                                UPDATE actions
+                                SET status='applied', applied_at=?
+                                WHERE id=?
+                            """, (utcnow(), action_id))
+
+                        c.execute("RELEASE action_row")
+
+                    except Exception as e:
+                        c.execute("ROLLBACK TO action_row")
+                        c.execute("RELEASE action_row")
+
+                        log(f"[ERROR] action_id={action_id}: {e}")
+
+                        if not dry_run:
+                            c.execute("""
+                                UPDATE actions
+                                SET status='error', error=?
+                                WHERE id=?
+                            """, (str(e), action_id))
+
+                        summary["error"] += 1
+
+                    # Files are already moved at this point, so keep the
+                    # window of uncommitted rows small in both count and time
+                    uncommitted += 1
+                    if (
+                        uncommitted >= COMMIT_BATCH_SIZE
+                        or time.monotonic() - last_commit >= COMMIT_INTERVAL
+                    ):
+                        conn.commit()
+                        uncommitted = 0
+                        last_commit = time.monotonic()
+        finally:
             conn.commit()
 
-        except Exception as e:
-            log(f"[ERROR] action_id={action_id}: {e}")
-
-            if not dry_run:
-                c.execute("""
-                    UPDATE actions
-                    SET status='error', error=?
-                    WHERE id=?
-                """, (str(e), action_id))
-                conn.commit()
-
-            summary["error"] += 1
-
+    # Fold the WAL back into the database file and truncate it
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
     conn.close()
 
     log("Execution finished")
@@ -211,6 +361,12 @@ def main():
     parser.add_argument("--trash-root", default="to_trash")
     parser.add_argument("--apply", action="store_true", help="Apply actions")
     parser.add_argument("--limit", type=int)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Parallel file moves (default: 8)"
+    )
     args = parser.parse_args()
 
     db_path = args.db or os.getenv("MUSIC_DB")
@@ -223,6 +379,7 @@ def main():
         trash_root=args.trash_root,
         dry_run=not args.apply,
         limit=args.limit,
+        workers=args.workers,
     )
 
 
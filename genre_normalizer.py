@@ -6,6 +6,7 @@ import sqlite3
 from datetime import datetime, timezone
 
 SPLIT_RE = re.compile(r"[;/,|]+")
+NON_WORD_RE = re.compile(r"\W+")
 
 
 def utcnow():
@@ -17,7 +18,7 @@ def normalize_token(token: str) -> str:
     Normalize a genre token for comparison.
     Lowercase, strip non-alphanumerics.
     """
-    return re.sub(r"\W+", "", token.lower())
+    return NON_WORD_RE.sub("", token.lower())
 
 
 def tokenize(raw: str):
@@ -40,6 +41,15 @@ def normalize_genres(db_path, dry_run=False):
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
 
+    # Load the whole mapping table once; it is small compared to `files`
+    mappings = {
+        r["normalized_token"]: r["genre_id"]
+        for r in c.execute("""
+            SELECT normalized_token, genre_id
+            FROM genre_mappings
+        """)
+    }
+
     files = c.execute("""
         SELECT id, genre
         FROM files
@@ -49,23 +59,24 @@ def normalize_genres(db_path, dry_run=False):
     unmapped = set()
     applied = 0
 
-    for f in files:
-        tokens = tokenize(f["genre"])
-
-        for raw_token in tokens:
-            norm = normalize_token(raw_token)
-
-            mapping = c.execute("""
-                SELECT genre_id
-                FROM genre_mappings
-                WHERE normalized_token = ?
-            """, (norm,)).fetchone()
+    # Most raw genre strings repeat across many files (one per album
+    # track), so each distinct string is tokenized only once.
+    tokens_by_raw = {}
 
-            if mapping is None:
+    for f in files:
+        raw = f["genre"]
+        tokens = tokens_by_raw.get(raw)
+        if tokens is None:
+            tokens = [(t, normalize_token(t)) for t in tokenize(raw)]
+            tokens_by_raw[raw] = tokens
+
+        for raw_token, norm in tokens:
+            if norm not in mappings:
                 unmapped.add(raw_token)
                 continue
 
-            if mapping["genre_id"] is None:
+            genre_id = mappings[norm]
+            if genre_id is None:
                 # Explicitly ignored token
                 continue
 
@@ -75,7 +86,7 @@ def normalize_genres(db_path, dry_run=False):
                         file_id, genre_id, source, confidence, created_at
                     )
                     VALUES (?, ?, 'tag', 0.7, ?)
-                """, (f["id"], mapping["genre_id"], utcnow()))
+                """, (f["id"], genre_id, utcnow()))
 
             applied += 1
 
@@ -2,7 +2,6 @@
 
 from datetime import datetime, timezone
 import unicodedata
-import re
 from collections import defaultdict
 
 EDITABLE_STATES = {"new", "reviewing"}
@@ -23,11 +22,12 @@ def normalize_token(s: str) -> str:
     """
     if not s:
         return ""
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    s = s.lower()
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
+    # ASCII has nothing to decompose; skip the per-character filter
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(c for c in s if not unicodedata.combining(c))
+    # str.split() with no args collapses whitespace runs and strips
+    return " ".join(s.lower().split())
 
 
 # -------------------------------------------------
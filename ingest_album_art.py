@@ -11,10 +11,12 @@ Discovers album art from:
 Stores descriptive metadata only.
 """
 
+import io
 import os
 import sqlite3
 import hashlib
-from pathlib import Path
+import struct
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from PIL import Image
@@ -29,6 +31,13 @@ if not DB_PATH:
 
 IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
 COMMON_NAMES = {"cover", "folder", "front", "album"}
+INSERT_BATCH_SIZE = 1000
+MIN_COVER_BYTES = 4096
+
+# JPEG SOF0-SOF15, minus DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Enough to get past EXIF/ICC segments to the JPEG frame header
+HEADER_PEEK_BYTES = 65536
 
 
 def utcnow():
@@ -38,6 +47,17 @@ def utcnow():
 def connect_db():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB mmap reads
+
+    # ---- schema migration (safe) ----
+    cols = [r["name"] for r in conn.execute("PRAGMA table_info(album_art)")]
+    if "perceptual_hash" not in cols:
+        conn.execute("ALTER TABLE album_art ADD COLUMN perceptual_hash TEXT")
+
     return conn
 
 
@@ -45,6 +65,213 @@ def image_hash(data: bytes):
     return hashlib.sha256(data).hexdigest()
 
 
+def image_file_hash(fh):
+    # Hash straight from the file instead of reading it into memory first
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+    h = hashlib.sha256()
+    for chunk in iter(lambda: fh.read(65536), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def peek_image_header(data: bytes):
+    """
+    Read (format, width, height) from the leading bytes of a JPEG or PNG
+    without Pillow. Returns (None, None, None) if not recognised.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return "PNG", width, height
+
+    if data[:3] == b"\xff\xd8\xff":
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                break
+            marker = data[i + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                i += 1
+                continue
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return "JPEG", width, height
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                # Standalone markers carry no length field
+                i += 2
+                continue
+            i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+
+    return None, None, None
+
+
+def describe_image(source, header: bytes):
+    """
+    Return (format, width, height, perceptual_hash) for an image.
+
+    Format and size come from the header bytes for JPEG/PNG; Pillow is
+    only needed for the perceptual hash and as a fallback.
+    """
+    fmt, width, height = peek_image_header(header)
+
+    with Image.open(source) as img:
+        if fmt is None:
+            fmt = img.format
+            width, height = img.size
+        return fmt, width, height, perceptual_hash(img)
+
+
+def perceptual_hash(img):
+    """
+    64-bit difference hash (dHash) as 16 hex chars.
+
+    Re-encoded or slightly resized copies of the same cover map to the
+    same value, unlike sha256. Returns None if the image can't be decoded.
+    Read img.size before calling: draft() may shrink the decoded image.
+    """
+    try:
+        # JPEGs can decode straight to grayscale at 1/8 scale; this is a
+        # no-op for other formats. Must run before anything loads pixels.
+        img.draft("L", (9, 8))
+        px = img.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    except Exception:
+        return None
+
+    bits = 0
+    for row in range(0, 72, 9):
+        for x in range(row, row + 8):
+            bits = (bits << 1) | (px[x + 1] > px[x])
+    return f"{bits:016x}"
+
+
+def embedded_pictures(tags):
+    """
+    Yield the raw image bytes of every picture in `tags`: ID3 APIC
+    frames and MP4 covr atoms. Other binary frames (PRIV, GEOB, MCDI...)
+    are not images and are skipped.
+    """
+    if hasattr(tags, "getall"):
+        for frame in tags.getall("APIC"):
+            yield frame.data
+    else:
+        # MP4Cover is a bytes subclass
+        for cover in tags.get("covr") or ():
+            yield bytes(cover)
+
+
+def scan_embedded_art(audio_path):
+    found = []
+
+    try:
+        audio = MutagenFile(audio_path, easy=False)
+        tags = audio.tags if audio else None
+    except Exception:
+        return found
+
+    if not tags:
+        return found
+
+    for data in embedded_pictures(tags):
+        # One undecodable picture must not hide the others
+        try:
+            h = image_hash(data)
+
+            mime, width, height, ph = describe_image(
+                io.BytesIO(data), data
+            )
+
+            found.append((
+                "embedded", 0.9, h, ph, mime, width, height
+            ))
+        except Exception:
+            continue
+
+    return found
+
+
+def scan_external_art(album_dir):
+    found = []
+
+    try:
+        with os.scandir(album_dir) as it:
+            entries = list(it)
+    except OSError:
+        return found
+
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() not in IMAGE_EXTS:
+            continue
+
+        if stem.lower() not in COMMON_NAMES:
+            continue
+
+        img_path = entry.path
+
+        try:
+            # Tiny stubs are never usable covers; skip them before hashing
+            if entry.stat().st_size < MIN_COVER_BYTES:
+                continue
+
+            # One open serves the header peek, the hash and the decode
+            with open(img_path, "rb") as fh:
+                header = fh.read(HEADER_PEEK_BYTES)
+                fh.seek(0)
+                h = image_file_hash(fh)
+                fh.seek(0)
+                mime, width, height, ph = describe_image(fh, header)
+
+            found.append((
+                "external", 0.8, h, ph, mime, width, height
+            ))
+
+        except Exception:
+            continue
+
+    return found
+
+
+def scan_album_dir(album_dir, albums):
+    """
+    Collect album art candidates for one directory.
+
+    `albums` holds one list of audio paths per album in the directory.
+    Returns (embedded, external): embedded[i] are the candidates for
+    albums[i], external ones apply to every album in the directory.
+    Candidates are plain tuples:
+        (source, confidence, image_hash, perceptual_hash,
+         mime, width, height)
+
+    Runs in a worker process; de-duplication and all DB writes stay in
+    the parent process.
+    """
+    embedded = []
+    for paths in albums:
+        found = []
+        # Tracks of an album normally share one cover, so stop at the
+        # first track that carries any embedded art.
+        for audio_path in paths:
+            found = scan_embedded_art(audio_path)
+            if found:
+                break
+        embedded.append(found)
+
+    return embedded, scan_external_art(album_dir)
+
+
+def insert_album_art(c, rows):
+    c.executemany("""
+        INSERT OR IGNORE INTO album_art (
+            album_artist, album, is_compilation,
+            image_hash, perceptual_hash, source, confidence,
+            mime, width, height,
+            created_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
 def ingest():
     conn = connect_db()
     c = conn.cursor()
@@ -59,79 +286,58 @@ def ingest():
         WHERE album IS NOT NULL
     """).fetchall()
 
-    print(f"[INFO] Scanning album art for {len(files)} files")
-
-    seen = set()
-
+    # Group by directory, then by album inside it, so every directory is
+    # listed once and its cover files are hashed once.
+    by_dir = {}
     for f in files:
-        audio_path = Path(f["original_path"])
-        album_dir = audio_path.parent
+        album_dir = os.path.dirname(f["original_path"])
+        album_key = (f["album_artist"], f["album"], f["is_compilation"])
+        by_dir.setdefault(album_dir, {}).setdefault(album_key, []).append(
+            f["original_path"]
+        )
 
-        # ---------- Embedded art ----------
-        try:
-            audio = MutagenFile(audio_path, easy=False)
-            if audio and hasattr(audio, "tags"):
-                for tag in audio.tags.values():
-                    if hasattr(tag, "data"):
-                        data = tag.data
-                        h = image_hash(data)
-                        if h in seen:
-                            continue
-
-                        img = Image.open(Path(audio_path))
-                        width, height = img.size
-
-                        c.execute("""
-                            INSERT OR IGNORE INTO album_art (
-                                album_artist, album, is_compilation,
-                                image_hash, source, confidence,
-                                mime, width, height,
-                                created_at
-                            )
-                            VALUES (?, ?, ?, ?, 'embedded', 0.9, ?, ?, ?, ?)
-                        """, (
-                            f["album_artist"], f["album"], f["is_compilation"],
-                            h, img.format, width, height, utcnow()
-                        ))
-
-                        seen.add(h)
-        except Exception:
-            pass
-
-        # ---------- External art ----------
-        for img_path in album_dir.iterdir():
-            if img_path.suffix.lower() not in IMAGE_EXTS:
-                continue
+    print(
+        f"[INFO] Scanning album art for {len(files)} files "
+        f"in {len(by_dir)} directories"
+    )
 
-            if img_path.stem.lower() not in COMMON_NAMES:
-                continue
-
-            try:
-                data = img_path.read_bytes()
-                h = image_hash(data)
-                if h in seen:
-                    continue
-
-                img = Image.open(img_path)
-                width, height = img.size
-
-                c.execute("""
-                    INSERT OR IGNORE INTO album_art (
-                        album_artist, album, is_compilation,
-                        image_hash, source, confidence,
-                        mime, width, height,
-                        created_at
-                    )
-                    VALUES (?, ?, ?, ?, 'external', 0.8, ?, ?, ?, ?)
-                """, (
-                    f["album_artist"], f["album"], f["is_compilation"],
-                    h, img.format, width, height, utcnow()
-                ))
-
-                seen.add(h)
-
-            except Exception:
-                continue
+    seen = set()
+    art_rows = []
+
+    # Image decoding/hashing is CPU-bound and independent per directory,
+    # so it is spread across processes; SQLite stays single-writer here.
+    with ProcessPoolExecutor() as ex:
+        results = ex.map(
+            scan_album_dir,
+            list(by_dir),
+            [list(albums.values()) for albums in by_dir.values()],
+            chunksize=4,
+        )
+
+        for albums, (embedded, external) in zip(by_dir.values(), results):
+            for album_key, found in zip(albums, embedded):
+                for source, confidence, h, ph, mime, width, height in (
+                    found + external
+                ):
+                    # Near-duplicate covers collapse on the perceptual
+                    # hash, but only within an album: generic or blank
+                    # covers share a dHash across unrelated albums
+                    key = (album_key, ph or h)
+                    if key in seen:
+                        continue
+
+                    art_rows.append((
+                        *album_key,
+                        h, ph, source, confidence, mime, width, height,
+                        utcnow()
+                    ))
+                    seen.add(key)
+
+            if len(art_rows) >= INSERT_BATCH_SIZE:
+                insert_album_art(c, art_rows)
+                art_rows.clear()
+
+    insert_album_art(c, art_rows)
 
     conn.commit()
     conn.close()
@@ -53,9 +53,10 @@ def main():
        valid.
     2. Find fingerprints that appear in multiple files (clusters).
     3. For each cluster, choose a canonical representative using a
-       bitrate-based heuristic (highest bitrate first).
+       bitrate-based heuristic (highest bitrate first), ranked with a
+       SQL window function.
     4. Record perceptual duplicate relationships with conservative
-       confidence scores.
+       confidence scores, all in a single INSERT ... SELECT.
 
     NOTE:
     Canonical selection here is *contextual* and used only to give
@@ -69,83 +70,63 @@ def main():
     # Ensure duplicate rows reference existing files.
     c.execute("PRAGMA foreign_keys = ON")
 
-    # Discover fingerprint clusters (fingerprint present in >1 row).
-    c.execute("""
-        SELECT fingerprint
-        FROM files
-        WHERE fingerprint IS NOT NULL
-        GROUP BY fingerprint
-        HAVING COUNT(*) > 1
-    """)
-    fps = [r["fingerprint"] for r in c.fetchall()]
-
-    print(f"[INFO] Found {len(fps)} fingerprint duplicate clusters")
-
-    for fp in fps:
-        # Fetch candidate rows for this fingerprint. We pull `bitrate`
-        # because it is used as a simple quality heuristic when
-        # choosing a canonical representative.
-        c.execute("""
-            SELECT id, bitrate
+    # Count fingerprint clusters (fingerprint present in >1 row).
+    clusters = c.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT fingerprint
             FROM files
-            WHERE fingerprint = ?
-        """, (fp,))
-        rows = c.fetchall()
-
-        if not rows:
-            continue
-
-        # Prefer the highest-bitrate file as the canonical representative.
-        # This heuristic is deterministic and favors higher-quality
-        # encodings, but it does NOT imply execution intent.
-        rows = sorted(
-            rows,
-            key=lambda r: r["bitrate"] or 0,
-            reverse=True
+            WHERE fingerprint IS NOT NULL
+            GROUP BY fingerprint
+            HAVING COUNT(*) > 1
         )
+    """).fetchone()[0]
+
+    print(f"[INFO] Found {clusters} fingerprint duplicate clusters")
+
+    changes_before = conn.total_changes
 
-        canonical = rows[0]["id"]
-
-        # NOTE:
-        # The following UPDATE was intentionally disabled.
-        #
-        # Assigning status/action here would prematurely convert
-        # probabilistic evidence into execution intent. Canonical
-        # selection is used only to orient duplicate relationships.
-        #
-        # c.execute("""
-        #     UPDATE files
-        #     SET status='unique', action='move'
-        #     WHERE id=?
-        # """, (canonical,))
-
-        for r in rows[1:]:
-            dup_id = r["id"]
-
-            # Record the perceptual duplicate relationship. Confidence
-            # is intentionally < 1.0 to reflect the fuzzy nature of
-            # fingerprint matching.
-            c.execute("""
-                INSERT OR IGNORE INTO duplicates
-                (file1_id, file2_id, reason, confidence, created_at)
-                VALUES (?, ?, 'fingerprint', 0.85, ?)
-            """, (canonical, dup_id, utcnow()))
-
-            # NOTE:
-            # This UPDATE was intentionally disabled for the same reason
-            # as the canonical update above. This script records
-            # perceptual duplicate evidence only.
-            #
-            # c.execute("""
-            #     UPDATE files
-            #     SET status='duplicate', action='archive'
-            #     WHERE id=?
-            # """, (dup_id,))
+    # Rank each cluster in SQL and record every relationship in one
+    # statement instead of one query plus N inserts per cluster.
+    #
+    # Prefer the highest-bitrate file as the canonical representative
+    # (lowest id on ties). This heuristic is deterministic and favors
+    # higher-quality encodings, but it does NOT imply execution intent.
+    #
+    # Confidence is intentionally < 1.0 to reflect the fuzzy nature of
+    # fingerprint matching.
+    c.execute("""
+        WITH ranked AS (
+            SELECT
+                id,
+                FIRST_VALUE(id) OVER w AS canonical_id,
+                ROW_NUMBER() OVER w AS rn
+            FROM files
+            WHERE fingerprint IS NOT NULL
+            WINDOW w AS (
+                PARTITION BY fingerprint
+                ORDER BY COALESCE(bitrate, 0) DESC, id
+            )
+        )
+        INSERT OR IGNORE INTO duplicates
+        (file1_id, file2_id, reason, confidence, created_at)
+        SELECT canonical_id, id, 'fingerprint', 0.85, ?
+        FROM ranked
+        WHERE rn > 1
+    """, (utcnow(),))
+
+    recorded = conn.total_changes - changes_before
+
+    # NOTE:
+    # No status/action UPDATE is issued for either side of a cluster.
+    #
+    # Assigning status/action here would prematurely convert
+    # probabilistic evidence into execution intent. Canonical
+    # selection is used only to orient duplicate relationships.
 
     conn.commit()
     conn.close()
 
-    print("[✓] Fingerprint duplicate relationships recorded")
+    print(f"[✓] Fingerprint duplicate relationships recorded: {recorded}")
 
 
 if __name__ == "__main__":
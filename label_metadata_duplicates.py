@@ -29,7 +29,9 @@ Design notes:
 
 import sqlite3
 import os
+import numpy as np
 from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
@@ -40,6 +42,15 @@ DB_PATH = os.getenv("MUSIC_DB", "music_consolidation.db")
 HIGH = 0.90
 MEDIUM = 0.75
 
+# Working memory for one block of the similarity matrix. The number of
+# rows scored per cdist call is derived from it, so peak memory stays
+# near this budget instead of growing with N x N.
+SCORE_MEMORY_BUDGET = 64 << 20  # 64 MiB
+# Bytes per cell of a block: two float64 buffers (score, scratch), one
+# bool mask, and the float64 cdist result, which has at most as many
+# rows and columns as the block (it is scored on distinct strings).
+BYTES_PER_CELL = 8 + 8 + 1 + 8
+
 
 def utcnow():
     """
@@ -65,13 +76,129 @@ def similarity(a, b):
     return fuzz.ratio(a, b) / 100.0
 
 
+def similarity_block(queries, choices):
+    """
+    Compute `similarity` for every (query, choice) pair as a matrix.
+
+    Why: `cdist` runs all comparisons in C across every core instead of
+    one Python call per pair, which is what made the all-pairs scan
+    slow. Missing values score 0, exactly like `similarity`.
+    """
+    scores = cdist(
+        [q or "" for q in queries],
+        [c or "" for c in choices],
+        scorer=fuzz.ratio,
+        dtype=np.float64,
+        workers=-1,
+    )
+    scores /= 100.0
+    scores[[not q for q in queries], :] = 0
+    scores[:, [not c for c in choices]] = 0
+    return scores
+
+
+def encode(values):
+    """
+    Return (distinct_values, codes) with values[i] == distinct[codes[i]].
+
+    Why: Many rows share the same string (every track of an album has
+    the same artist), so only distinct strings are scored and the
+    results are indexed back out per row.
+    """
+    index = {}
+    codes = [index.setdefault(v or "", len(index)) for v in values]
+    return list(index), np.array(codes, dtype=np.intp)
+
+
+def expanded_similarity(distinct, codes, start, stop, out):
+    """
+    `similarity` of rows[start:stop] against all rows, computed on
+    distinct strings only and written into `out`.
+    """
+    block = codes[start:stop]
+    block_distinct = np.unique(block)
+    scores = similarity_block(
+        [distinct[k] for k in block_distinct], distinct
+    )
+    rows = np.searchsorted(block_distinct, block)
+    # One row at a time, so the expansion writes straight into `out`
+    # without a (rows x N) temporary
+    for k, row in enumerate(rows):
+        np.take(scores[row], codes, out=out[k])
+    return out
+
+
+def block_rows(n):
+    """
+    Rows per block so that the block buffers fit SCORE_MEMORY_BUDGET.
+    """
+    return max(1, min(n, SCORE_MEMORY_BUDGET // (max(n, 1) * BYTES_PER_CELL)))
+
+
+def score_pairs(rows):
+    """
+    Yield (i, j, score) for every pair i < j in `rows` whose combined
+    score reaches `MEDIUM`.
+
+    Why: Artist and title are weighted 0.5 each, with +0.05 when the
+    durations are within 3 seconds. Evaluating a block of rows at a
+    time with NumPy keeps the O(n^2) comparison out of Python loops;
+    the block buffers are allocated once and reused in place.
+    """
+    # Prefer album_artist when available.
+    artists, artist_codes = encode(
+        r["album_artist"] or r["artist"] for r in rows
+    )
+    titles, title_codes = encode(r["title"] for r in rows)
+    # Missing or zero durations never get the tolerance bonus.
+    durations = np.array(
+        [r["duration"] or np.nan for r in rows], dtype=np.float64
+    )
+
+    n = len(rows)
+    step = block_rows(n)
+    # float64 with the same operation order as `similarity`, so scores
+    # sitting exactly on HIGH or MEDIUM compare the same way
+    score_buf = np.empty((step, n), dtype=np.float64)
+    tmp_buf = np.empty((step, n), dtype=np.float64)
+    close_buf = np.empty((step, n), dtype=bool)
+
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        score = score_buf[:stop - start]
+        tmp = tmp_buf[:stop - start]
+        close = close_buf[:stop - start]
+
+        # Combine artist and title similarity with equal weight.
+        expanded_similarity(artists, artist_codes, start, stop, score)
+        expanded_similarity(titles, title_codes, start, stop, tmp)
+        np.multiply(score, 0.5, out=score)
+        np.multiply(tmp, 0.5, out=tmp)
+        np.add(score, tmp, out=score)
+
+        # Apply small duration tolerance.
+        np.subtract(durations[start:stop, None], durations[None, :], out=tmp)
+        np.abs(tmp, out=tmp)
+        np.less_equal(tmp, 3, out=close)
+        np.add(score, 0.05, out=score, where=close)
+
+        # Only the upper triangle, so each pair is seen once.
+        np.greater_equal(score, MEDIUM, out=close)
+        i_idx, j_idx = np.nonzero(close)
+        i_idx += start
+        keep = j_idx > i_idx
+        for i, j in zip(i_idx[keep], j_idx[keep]):
+            yield int(i), int(j), float(score[i - start, j])
+
+
 def main():
     """
     Main entry point for metadata-based duplicate detection.
 
     High-level algorithm:
     - Load candidate rows from the `files` table.
-    - Compare each pair using fuzzy similarity on artist/album/title.
+    - Compare each pair using fuzzy similarity on artist/album/title,
+      scored in blocks with `rapidfuzz.process.cdist`.
     - Prefer `album_artist` when available to improve matching for
       credited compilations.
     - Apply a short duration tolerance to boost confidence when the
@@ -108,39 +235,19 @@ def main():
     """)
     rows = c.fetchall()
 
-    seen = set()
     labeled = 0
 
     print(f"[INFO] Found {len(rows)} metadata comparison candidates")
 
-    for i, r1 in enumerate(rows):
-        for r2 in rows[i + 1:]:
-            # Use a sorted tuple of IDs to ensure each pair is processed once.
-            key = tuple(sorted((r1["id"], r2["id"])))
-            if key in seen:
-                continue
-
-            # Safety: avoid matching across compilation boundaries.
-            if r1["is_compilation"] != r2["is_compilation"]:
-                continue
-
-            # Prefer album_artist when available.
-            a1 = r1["album_artist"] or r1["artist"]
-            a2 = r2["album_artist"] or r2["artist"]
-
-            artist_sim = similarity(a1, a2)
-            title_sim = similarity(r1["title"], r2["title"])
-
-            # Combine artist and title similarity with equal weight.
-            score = (artist_sim * 0.5) + (title_sim * 0.5)
-
-            # Apply small duration tolerance.
-            if r1["duration"] and r2["duration"]:
-                if abs(r1["duration"] - r2["duration"]) <= 3:
-                    score += 0.05
+    # Safety: avoid matching across compilation boundaries, so each
+    # compilation flag is scored as its own block.
+    groups = {}
+    for r in rows:
+        groups.setdefault(r["is_compilation"], []).append(r)
 
-            if score < MEDIUM:
-                continue
+    for group in groups.values():
+        for i, j, score in score_pairs(group):
+            r1, r2 = group[i], group[j]
 
             # Tiered confidence scoring.
             confidence = (
@@ -171,7 +278,6 @@ def main():
             #     WHERE id=?
             # """, (dup,))
 
-            seen.add(key)
             labeled += 1
 
     conn.commit()
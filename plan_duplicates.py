@@ -14,7 +14,6 @@ This module is the thinker.
 import os
 import sqlite3
 import argparse
-from pathlib import Path
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
@@ -30,11 +29,36 @@ def utcnow():
 def connect_db(db_path):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB mmap reads
+    ensure_indexes(conn)
     return conn
 
 
-def lossless(ext):
-    return ext.lower() in (".flac", ".wav", ".aiff", ".aif")
+def ensure_indexes(conn):
+    """
+    Indexes for the duplicate filter and the pending-action lookup.
+    The duplicates table is owned by the label_* scripts, so they are
+    created here rather than in the base schema.
+    """
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_dup_reason_conf
+            ON duplicates(reason, confidence);
+        CREATE INDEX IF NOT EXISTS idx_dup_file2
+            ON duplicates(file2_id);
+        CREATE INDEX IF NOT EXISTS idx_actions_file_status
+            ON actions(file_id, status);
+    """)
+
+
+LOSSLESS_EXTS = (".flac", ".wav", ".aiff", ".aif")
+
+
+def lossless(path):
+    return path.lower().endswith(LOSSLESS_EXTS)
 
 
 def preferred(a, b):
@@ -42,8 +66,8 @@ def preferred(a, b):
     Decide which file is canonical.
     Returns (keep, archive)
     """
-    if lossless(a["ext"]) != lossless(b["ext"]):
-        return (a, b) if lossless(a["ext"]) else (b, a)
+    if a["lossless"] != b["lossless"]:
+        return (a, b) if a["lossless"] else (b, a)
 
     if a["bitrate"] and b["bitrate"] and a["bitrate"] != b["bitrate"]:
         return (a, b) if a["bitrate"] > b["bitrate"] else (b, a)
@@ -76,17 +100,11 @@ def plan_duplicates(db_path, apply=False, verbose=True):
 
             f1.id          AS id1,
             f1.original_path AS path1,
-            f1.album       AS album1,
-            f1.album_artist AS artist1,
-            f1.is_compilation AS comp1,
             f1.bitrate     AS bitrate1,
             f1.size_bytes AS size1,
 
             f2.id          AS id2,
             f2.original_path AS path2,
-            f2.album       AS album2,
-            f2.album_artist AS artist2,
-            f2.is_compilation AS comp2,
             f2.bitrate     AS bitrate2,
             f2.size_bytes AS size2
 
@@ -95,25 +113,31 @@ def plan_duplicates(db_path, apply=False, verbose=True):
         JOIN files f2 ON f2.id = d.file2_id
         WHERE d.reason IN ('sha256','fingerprint')
           AND d.confidence >= 0.9
+
+          -- ---------- SAFETY FILTERS ----------
+          AND f1.album IS f2.album
+          AND f1.album_artist IS f2.album_artist
+          AND COALESCE(f1.is_compilation, 0) = 0
+          AND COALESCE(f2.is_compilation, 0) = 0
     """).fetchall()
 
     if verbose:
         print(f"[PLAN] Evaluating {len(rows)} strong duplicate pairs")
 
+    # Files that already have a pending action, loaded once. Files
+    # planned in this run are added as we go, since their actions are
+    # only written in one batch at the end.
+    pending = {
+        r["file_id"] for r in c.execute("""
+            SELECT file_id FROM actions
+            WHERE status = 'pending'
+        """)
+    }
+
     planned = 0
+    action_rows = []
 
     for r in rows:
-        # ---------- SAFETY FILTERS ----------
-
-        if r["album1"] != r["album2"]:
-            continue
-
-        if r["comp1"] or r["comp2"]:
-            continue
-
-        if r["artist1"] != r["artist2"]:
-            continue
-
         # ---------- CANONICAL SELECTION ----------
 
         f1 = {
@@ -121,7 +145,7 @@ def plan_duplicates(db_path, apply=False, verbose=True):
             "path": r["path1"],
             "bitrate": r["bitrate1"],
             "size_bytes": r["size1"],
-            "ext": Path(r["path1"]).suffix,
+            "lossless": lossless(r["path1"]),
         }
 
         f2 = {
@@ -129,20 +153,14 @@ def plan_duplicates(db_path, apply=False, verbose=True):
             "path": r["path2"],
             "bitrate": r["bitrate2"],
             "size_bytes": r["size2"],
-            "ext": Path(r["path2"]).suffix,
+            "lossless": lossless(r["path2"]),
         }
 
         keep, archive = preferred(f1, f2)
 
         # ---------- EXISTING INTENT CHECK ----------
 
-        exists = c.execute("""
-            SELECT 1 FROM actions
-            WHERE file_id = ?
-              AND status = 'pending'
-        """, (archive["id"],)).fetchone()
-
-        if exists:
+        if archive["id"] in pending:
             continue
 
         if verbose:
@@ -152,24 +170,28 @@ def plan_duplicates(db_path, apply=False, verbose=True):
             )
 
         if apply:
-            c.execute("""
-                INSERT INTO actions (
-                    file_id,
-                    action,
-                    src_path,
-                    created_at
-                )
-                VALUES (?, 'archive', ?, ?)
-            """, (
+            action_rows.append((
                 archive["id"],
                 archive["path"],
                 utcnow()
             ))
+            pending.add(archive["id"])
             planned += 1
 
     if apply:
+        c.executemany("""
+            INSERT INTO actions (
+                file_id,
+                action,
+                src_path,
+                created_at
+            )
+            VALUES (?, 'archive', ?, ?)
+        """, action_rows)
         conn.commit()
 
+    # Gathers planner statistics for the indexes above when needed
+    conn.execute("PRAGMA optimize")
     conn.close()
 
     if verbose:
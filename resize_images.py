@@ -12,10 +12,15 @@ Usage:
 Dependencies:
     - Pillow (PIL) library for image processing.
       Install with: pip install Pillow
+    - Optional: Pillow-SIMD is a drop-in replacement with SIMD resize and
+      JPEG kernels, and needs no code changes. On x86 with AVX2:
+        pip uninstall pillow
+        CC="cc -mavx2" pip install -U --force-reinstall pillow-simd
 """
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
 # Supported image extensions
@@ -31,16 +36,13 @@ def resize_image(image_path):
                 # No resizing needed
                 return False
 
-            # Calculate new size preserving aspect ratio
-            if width > height:
-                new_width = MAX_DIMENSION
-                new_height = int((MAX_DIMENSION / width) * height)
-            else:
-                new_height = MAX_DIMENSION
-                new_width = int((MAX_DIMENSION / height) * width)
+            # thumbnail() preserves aspect ratio and, with reducing_gap set,
+            # lets JPEGs decode at a reduced scale (draft) and box-reduce
+            # before the final Lanczos pass
+            img.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS, reducing_gap=2.0)
+            new_width, new_height = img.size
 
-            resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-            resized_img.save(image_path)
+            img.save(image_path)
             print(f"Resized: {image_path} from {width}x{height} to {new_width}x{new_height}")
             return True
     except Exception as e:
@@ -48,9 +50,8 @@ def resize_image(image_path):
         return False
 
 def crawl_and_resize(directory):
-    # Initialize counters for total images and resized images
-    total_images = 0
-    resized_count = 0
+    # Collect the image paths first so they can be handed to the pool
+    image_paths = []
     # Walk through the directory and its subdirectories
     for root, _, files in os.walk(directory):
         # Iterate through each file in the directory
@@ -59,15 +60,18 @@ def crawl_and_resize(directory):
             ext = os.path.splitext(file)[1].lower()
             # Check if the file extension is in the list of image extensions
             if ext in IMAGE_EXTENSIONS:
-                # Increment the total images counter
-                total_images += 1
-                # Get the full path of the image
-                image_path = os.path.join(root, file)
-                # Resize the image and increment the resized images counter if successful
-                if resize_image(image_path):
-                    resized_count += 1
+                image_paths.append(os.path.join(root, file))
+
+    # Pillow releases the GIL while decoding, resizing and encoding,
+    # so threads are enough to keep every core busy
+    resized_count = 0
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for resized in executor.map(resize_image, image_paths):
+            # Count the images that were actually resized
+            if resized:
+                resized_count += 1
     # Print the total number of images processed and the number of images resized
-    print(f"Processed {total_images} images, resized {resized_count} images.")
+    print(f"Processed {len(image_paths)} images, resized {resized_count} images.")
 
 def main():
     if len(sys.argv) != 2:
@@ -22,47 +22,55 @@ PRIORITY = {
 def main():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    # Gather all duplicate relations
-    c.execute("""
-        SELECT
-            file2_id,
-            reason,
-            confidence
-        FROM duplicates
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB mmap reads
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_dup_file2
+            ON duplicates(file2_id)
     """)
-    rows = c.fetchall()
-
-    best = {}
-
-    for r in rows:
-        fid = r["file2_id"]
-        reason = r["reason"]
-
-        if reason not in PRIORITY:
-            continue
+    c = conn.cursor()
 
-        score = PRIORITY[reason]
+    # Pick the strongest relation per duplicate file and apply it in a
+    # single statement; ties keep the earliest recorded relation.
+    priority_case = " ".join(
+        f"WHEN '{reason}' THEN {score}" for reason, score in PRIORITY.items()
+    )
 
-        if fid not in best or score > best[fid][0]:
-            best[fid] = (score, reason, r["confidence"])
+    changes_before = conn.total_changes
 
-    # Apply normalization
-    for fid, (_, reason, confidence) in best.items():
-        c.execute("""
-            UPDATE files
-            SET
-                status='duplicate',
-                action='archive',
-                notes=?
-            WHERE id=?
-        """, (f"{reason}_match (confidence={confidence})", fid))
+    c.execute(f"""
+        WITH ranked AS (
+            SELECT
+                file2_id,
+                reason,
+                confidence,
+                ROW_NUMBER() OVER (
+                    PARTITION BY file2_id
+                    ORDER BY
+                        CASE reason {priority_case} END DESC,
+                        id
+                ) AS rn
+            FROM duplicates
+            WHERE reason IN ({",".join("?" * len(PRIORITY))})
+        )
+        UPDATE files
+        SET
+            status='duplicate',
+            action='archive',
+            notes=r.reason || '_match (confidence=' || r.confidence || ')'
+        FROM ranked r
+        WHERE r.rn = 1
+          AND files.id = r.file2_id
+    """, tuple(PRIORITY))
+    resolved = conn.total_changes - changes_before
 
     conn.commit()
     conn.close()
 
-    print(f"[✓] Conflict resolution applied to {len(best)} files")
+    print(f"[✓] Conflict resolution applied to {resolved} files")
 
 if __name__ == "__main__":
     main()
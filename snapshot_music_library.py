@@ -5,6 +5,11 @@ from datetime import datetime
 
 from mutagen import File as MutagenFile
 
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 def get_media_metadata(filepath):
     try:
         audio = MutagenFile(filepath, easy=True)
@@ -76,7 +81,12 @@ def write_tree_text(node, depth=0, file_handle=None):
             file_handle.write(f"{'  ' * depth}🎵 {key}\n")
 
 def save_snapshot(tree, output_file, json_mode=True):
-    if json_mode:
+    if json_mode and orjson:
+        # Same layout as json.dump(indent=2, ensure_ascii=False), but
+        # serialized in C; the tree holds one entry per library file
+        with open(output_file, "wb") as f:
+            f.write(orjson.dumps(tree, option=orjson.OPT_INDENT_2))
+    elif json_mode:
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(tree, f, indent=2, ensure_ascii=False)
     else:
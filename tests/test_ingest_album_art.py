@@ -0,0 +1,69 @@
+import io
+import os
+
+import pytest
+
+pytest.importorskip("mutagen")
+Image = pytest.importorskip("PIL.Image")
+
+from mutagen.id3 import ID3, APIC, PRIV
+
+os.environ.setdefault("MUSIC_DB", os.devnull)
+
+import ingest_album_art as iaa
+
+# 128 kbps / 44.1 kHz MPEG-1 Layer III frame, silent payload
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def cover_bytes():
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (200, 30, 30)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def write_mp3(path, frames):
+    with open(path, "wb") as fh:
+        fh.write(MP3_FRAME * 20)
+    tags = ID3()
+    for frame in frames:
+        tags.add(frame)
+    tags.save(str(path))
+
+
+def test_priv_frame_before_apic_keeps_cover(tmp_path):
+    path = tmp_path / "track.mp3"
+    cover = cover_bytes()
+    write_mp3(path, [
+        PRIV(owner="WM/MediaClassPrimaryID", data=b"\x00" * 16),
+        APIC(encoding=3, mime="image/jpeg", type=3, desc="", data=cover),
+    ])
+
+    found = iaa.scan_embedded_art(str(path))
+
+    assert len(found) == 1
+    source, confidence, h, ph, mime, width, height = found[0]
+    assert source == "embedded"
+    assert h == iaa.image_hash(cover)
+    assert (mime, width, height) == ("JPEG", 32, 32)
+    assert ph is not None
+
+
+def test_bad_picture_does_not_hide_others(tmp_path):
+    path = tmp_path / "track.mp3"
+    write_mp3(path, [
+        APIC(encoding=3, mime="image/jpeg", type=0, desc="a", data=b"junk"),
+        APIC(encoding=3, mime="image/jpeg", type=3, desc="b",
+             data=cover_bytes()),
+    ])
+
+    found = iaa.scan_embedded_art(str(path))
+
+    assert [f[4] for f in found] == ["JPEG"]
+
+
+def test_no_tags(tmp_path):
+    path = tmp_path / "track.mp3"
+    path.write_bytes(MP3_FRAME * 20)
+
+    assert iaa.scan_embedded_art(str(path)) == []
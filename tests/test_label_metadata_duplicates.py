@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("rapidfuzz")
+
+import label_metadata_duplicates as lmd
+
+
+def pairwise_scores(rows):
+    """The original all-pairs loop, kept as the reference."""
+    out = {}
+    for i, r1 in enumerate(rows):
+        for j in range(i + 1, len(rows)):
+            r2 = rows[j]
+            a1 = r1["album_artist"] or r1["artist"]
+            a2 = r2["album_artist"] or r2["artist"]
+
+            artist_sim = lmd.similarity(a1, a2)
+            title_sim = lmd.similarity(r1["title"], r2["title"])
+            score = (artist_sim * 0.5) + (title_sim * 0.5)
+
+            if r1["duration"] and r2["duration"]:
+                if abs(r1["duration"] - r2["duration"]) <= 3:
+                    score += 0.05
+
+            if score >= lmd.MEDIUM:
+                out[(i, j)] = score
+    return out
+
+
+def row(artist=None, title=None, duration=None, album_artist=None):
+    return {
+        "artist": artist,
+        "album_artist": album_artist,
+        "title": title,
+        "duration": duration,
+    }
+
+
+def test_score_exactly_high_keeps_high_tier():
+    # Same artist (1.0) and a title ratio of 80 -> exactly 0.90
+    rows = [row("Artist", "abcde"), row("Artist", "abcdx")]
+
+    assert pairwise_scores(rows) == {(0, 1): 0.9}
+    assert list(lmd.score_pairs(rows)) == [(0, 1, 0.9)]
+    assert 0.9 >= lmd.HIGH
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_score_pairs_matches_pairwise_loop(seed, monkeypatch):
+    rnd = random.Random(seed)
+    words = ["the", "love", "song", "blue", "red", "a", "night", "day"]
+
+    def text():
+        return rnd.choice(
+            [None, "", " ".join(rnd.choices(words, k=rnd.randint(1, 3)))]
+        )
+
+    rows = [
+        row(
+            text(),
+            text(),
+            rnd.choice([None, 0, 100, 101, 103, 104, 200.5]),
+            rnd.choice([None, text()]),
+        )
+        for _ in range(150)
+    ]
+
+    # Small budget, so the rows are scored over many blocks
+    monkeypatch.setattr(lmd, "SCORE_MEMORY_BUDGET", 150 * lmd.BYTES_PER_CELL * 7)
+
+    got = {(i, j): score for i, j, score in lmd.score_pairs(rows)}
+    assert got == pairwise_scores(rows)